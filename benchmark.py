@@ -0,0 +1,237 @@
+"""Benchmark of garment construction for all the design & body parameter files
+
+    Every garment goes through the phases (timed separately, each repeated a few times):
+        * construction -- creation of MetaGarment object
+        * assembly -- conversion into sewing pattern
+        * json -- saving the pattern specification
+        * svg -- drawing the pattern
+        * png -- rasterizing the drawing
+    Median times and peak memory (of Python allocations, measured in a separate
+    run) of every phase are saved to JSON report.
+    The caches of curve fitting and tangent matching results are cleared before 
+    every run, s.t. all the runs measure the full cost of the build.
+
+    The report of a previous run can be used as a baseline to catch regressions:
+        python benchmark.py -o Logs/bench_base.json
+        ...
+        python benchmark.py --baseline Logs/bench_base.json
+"""
+
+import argparse
+from datetime import datetime
+from glob import glob
+import gc
+import json
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import yaml
+
+# Makes core library available without extra installation steps
+sys.path.insert(0, './external/')
+sys.path.insert(1, './')
+
+import customconfig
+import pygarment as pyg
+from assets.garment_programs.meta_garment import MetaGarment
+from assets.body_measurments.body_params import BodyParameters
+
+PHASES = ['construction', 'assembly', 'json', 'svg', 'png']
+
+
+def get_command_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark garment construction over all design and body parameter files')
+    parser.add_argument('-b', '--bodies', nargs='+', default=['./assets/body_measurments/*.yaml'],
+                        help='Body measurements files (glob patterns are allowed)')
+    parser.add_argument('-d', '--designs', nargs='+', default=['./assets/design_params/*.yaml'],
+                        help='Design parameters files (glob patterns are allowed)')
+    parser.add_argument('-r', '--repeats', type=int, default=5, help='Number of timed runs of every garment')
+    parser.add_argument('-p', '--phases', nargs='+', default=PHASES, choices=PHASES,
+                        help='Phases to measure. Construction and assembly are always performed')
+    parser.add_argument('--no_memory', action='store_true', help='Skip peak memory measurements')
+    parser.add_argument('--profile', action='store_true',
+                        help='Save Chrome traces of the builds (see pygarment.BuildProfiler) next to the report')
+    parser.add_argument('-o', '--out', default=None,
+                        help='Report file (Logs/benchmark_<timestamp>.json by default)')
+    parser.add_argument('--baseline', default=None, help='Report of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative slowdown w.r.t. the baseline')
+
+    return parser.parse_args()
+
+
+def _expand(patterns):
+    files = []
+    for p in patterns:
+        files += sorted(glob(p)) or [p]
+    return files
+
+
+def clear_caches():
+    """Forget the results of curve fitting and optimization kept between the builds"""
+    for cache in pyg.esf.fit_cache.values():
+        cache.clear()
+    pyg.ops.tangent_match_cache.clear()
+
+
+def run_phases(name, body, design, phases, out_path):
+    """Run all the phases for a single garment
+
+        Returns the time of every phase
+        NOTE: the phases are performed only if the pattern is not empty
+    """
+    times = {}
+
+    start_time = time.perf_counter()
+    garment = MetaGarment(name, body, design)
+    times['construction'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    pattern = garment()
+    times['assembly'] = time.perf_counter() - start_time
+
+    if not pattern.panel_order():
+        return times
+
+    if 'json' in phases:
+        start_time = time.perf_counter()
+        pattern.serialize(out_path, to_subfolder=False, render=False)
+        times['json'] = time.perf_counter() - start_time
+
+    if 'svg' in phases or 'png' in phases:
+        start_time = time.perf_counter()
+        svg = pattern._draw_svg(with_text=False, view_ids=False).tostring()
+        times['svg'] = time.perf_counter() - start_time
+
+    if 'png' in phases:
+        start_time = time.perf_counter()
+        pattern._svg_to_png(svg_string=svg)
+        times['png'] = time.perf_counter() - start_time
+
+    return {p: t for p, t in times.items() if p in phases}
+
+
+def peak_memory(name, body, design, phases, out_path):
+    """Peak memory (bytes) of Python allocations in every phase
+        NOTE: counts all the memory allocated since the start of construction,
+        including the objects created in the previous phases
+    """
+    peaks = {}
+    tracemalloc.start()
+    try:
+        def phase_done(phase):
+            peaks[phase] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+
+        garment = MetaGarment(name, body, design)
+        phase_done('construction')
+        pattern = garment()
+        phase_done('assembly')
+        if pattern.panel_order():
+            if 'json' in phases:
+                pattern.serialize(out_path, to_subfolder=False, render=False)
+                phase_done('json')
+            if 'svg' in phases or 'png' in phases:
+                svg = pattern._draw_svg(with_text=False, view_ids=False).tostring()
+                phase_done('svg')
+            if 'png' in phases:
+                pattern._svg_to_png(svg_string=svg)
+                phase_done('png')
+    finally:
+        tracemalloc.stop()
+
+    return {p: m for p, m in peaks.items() if p in phases}
+
+
+def compare(stats, baseline_file, tolerance, min_diff=1e-3):
+    """List of the (datapoint, phase, baseline time, current time) that became slower than allowed"""
+    with open(baseline_file, 'r') as f:
+        baseline = json.load(f)['benchmark']['stats']['medians']
+
+    regressions = []
+    for name, times in stats['medians'].items():
+        for phase, value in times.items():
+            base_value = baseline.get(name, {}).get(phase)
+            if base_value is not None and value > base_value * (1 + tolerance) and value - base_value > min_diff:
+                regressions.append((name, phase, base_value, value))
+    return regressions
+
+
+if __name__ == '__main__':
+    args = get_command_args()
+
+    bodies, designs = _expand(args.bodies), _expand(args.designs)
+    out_file = Path(args.out or f'./Logs/benchmark_{datetime.now().strftime("%y%m%d-%H-%M-%S")}.json')
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    trace_path = out_file.parent / f'{out_file.stem}_traces'
+
+    props = customconfig.Properties()
+    props.set_basic(
+        name=out_file.stem,
+        creation_time=datetime.now().strftime("%y%m%d-%H-%M-%S"))
+    props.add_sys_info()
+    props.set_section_config(
+        'benchmark',
+        bodies=bodies,
+        designs=designs,
+        repeats=args.repeats,
+        phases=args.phases,
+        python=sys.version.split()[0])
+    stats = {'medians': {}, 'min': {}, 'peak_memory': {}, 'fails': [], 'errors': {}}
+
+    start_time = time.time()
+    with tempfile.TemporaryDirectory() as tmp_path:
+        for body_file in bodies:
+            body = BodyParameters(body_file)
+            for design_file in designs:
+                with open(design_file, 'r') as f_yaml:
+                    design = yaml.safe_load(f_yaml)['design']
+                name = f'{Path(body_file).stem}__{Path(design_file).stem}'
+
+                try:
+                    runs = []
+                    for _ in range(args.repeats):
+                        clear_caches()
+                        gc.collect()
+                        runs.append(run_phases(name, body, design, args.phases, tmp_path))
+                    phases = [p for p in args.phases if p in runs[0]]
+                    stats['medians'][name] = {p: statistics.median(r[p] for r in runs) for p in phases}
+                    stats['min'][name] = {p: min(r[p] for r in runs) for p in phases}
+                    if not args.no_memory:
+                        clear_caches()
+                        gc.collect()
+                        stats['peak_memory'][name] = peak_memory(name, body, design, args.phases, tmp_path)
+                    if args.profile:
+                        clear_caches()
+                        with pyg.BuildProfiler() as profiler:
+                            MetaGarment(name, body, design)()
+                        trace_path.mkdir(exist_ok=True)
+                        profiler.save_chrome_trace(trace_path / f'{name}.json')
+                except Exception as e:
+                    print(f'Benchmark::Error::{name} failed: {e}')
+                    stats['fails'].append(name)
+                    stats['errors'][name] = repr(e)
+                    continue
+
+                print(name, ' '.join(f'{p}={t * 1000:.1f}ms' for p, t in stats['medians'][name].items()))
+
+    # Totals over all the datapoints
+    stats['total_medians'] = {
+        p: sum(times.get(p, 0) for times in stats['medians'].values()) for p in args.phases}
+    props.set_section_stats('benchmark', total_time=time.time() - start_time, **stats)
+    props.serialize(out_file)
+
+    print('Total (sum of medians): ' + ' '.join(f'{p}={t:.2f}s' for p, t in stats['total_medians'].items()))
+    print(f'{len(stats["medians"])} garments measured, {len(stats["fails"])} failed. Report saved to {out_file}')
+
+    if args.baseline:
+        regressions = compare(stats, args.baseline, args.tolerance)
+        for name, phase, base_value, value in regressions:
+            print(f'Benchmark::Regression::{name}::{phase}: {base_value * 1000:.1f}ms -> {value * 1000:.1f}ms')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions w.r.t. {args.baseline}')
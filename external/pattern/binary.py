@@ -0,0 +1,231 @@
+"""
+    Compact binary (NPZ) container for pattern specifications
+
+    Geometry of the pattern is stored in columnar numpy arrays
+    s.t. it can be read without JSON parsing, e.g. by dataloaders:
+        * panel_names (P) -- panel names in the order of the specification
+        * translations, rotations (P x 3) -- panel placement
+        * vertices (V x 2), vertex_offsets (P + 1) -- vertices of all panels,
+            vertices of the i-th panel are vertices[vertex_offsets[i]:vertex_offsets[i + 1]]
+        * edge_endpoints (E x 2), edge_offsets (P + 1) -- vertex ids (local to the panel) of the edges
+        * curve_types (E) -- ids of the edge curvature types in CURVE_TYPES ('' = straight edge)
+        * curve_params (E x 4) -- curvature parameters (padded with nan):
+            control points (quadratic, cubic) or [radius, large_arc, right] (circle)
+        * stitches (S x 2 x 2) -- [panel id, edge id] of both sides of the stitches
+        * meta -- JSON-encoded bytes with the rest of the specification
+            (parameters, properties, extra fields of panels & edges, etc.)
+
+    Conversion to and from the JSON specification is loss-free.
+    NPZ files are saved uncompressed to allow memory-mapped loading
+"""
+
+import functools
+import io
+import json
+import zipfile
+import numpy as np
+
+CURVE_TYPES = ['', 'quadratic', 'cubic', 'circle']
+_CURVE_PARAMS = {'quadratic': (1, 2), 'cubic': (2, 2), 'circle': (3, )}   # Shapes of curvature parameters
+_PANEL_KEYS = ['translation', 'rotation', 'vertices', 'edges']
+_EDGES_KEY = '__edges__'    # Extra fields of the edges in the meta data
+
+
+def spec_to_arrays(spec):
+    """Convert pattern specification to the dictionary of arrays"""
+    pattern = spec['pattern']
+    panels = pattern['panels']
+    names = list(panels.keys())
+
+    meta = {k: v for k, v in spec.items() if k != 'pattern'}
+    meta['pattern'] = {k: v for k, v in pattern.items() if k not in ['panels', 'stitches']}
+    meta['pattern']['panels'] = extras = {}
+
+    vertices, endpoints, curve_types, curve_params = [], [], [], []
+    vertex_offsets, edge_offsets = [0], [0]
+    for name in names:
+        panel = panels[name]
+        vertices += panel['vertices']
+        vertex_offsets.append(len(vertices))
+
+        panel_extras = {k: v for k, v in panel.items() if k not in _PANEL_KEYS}
+        edge_extras = {}
+        for i, edge in enumerate(panel['edges']):
+            endpoints.append(edge['endpoints'])
+            c_type, c_params = _encode_curvature(edge.get('curvature'))
+            curve_types.append(CURVE_TYPES.index(c_type))
+            curve_params.append(c_params)
+
+            extra = {k: v for k, v in edge.items() if k not in ['endpoints', 'curvature']}
+            if 'curvature' in edge and not c_type:   # Not supported -- keep as is
+                extra['curvature'] = edge['curvature']
+            if extra:
+                edge_extras[str(i)] = extra
+        edge_offsets.append(len(endpoints))
+
+        if edge_extras:
+            panel_extras[_EDGES_KEY] = edge_extras
+        extras[name] = panel_extras
+
+    arrays = {
+        'panel_names': np.array(names, dtype=str),
+        'translations': np.array([panels[n]['translation'] for n in names], dtype=float).reshape(-1, 3),
+        'rotations': np.array([panels[n]['rotation'] for n in names], dtype=float).reshape(-1, 3),
+        'vertices': np.array(vertices, dtype=float).reshape(-1, 2),
+        'vertex_offsets': np.array(vertex_offsets, dtype=np.int64),
+        'edge_endpoints': np.array(endpoints, dtype=np.int64).reshape(-1, 2),
+        'edge_offsets': np.array(edge_offsets, dtype=np.int64),
+        'curve_types': np.array(curve_types, dtype=np.int8),
+        'curve_params': np.array(curve_params, dtype=float).reshape(-1, 4),
+    }
+
+    # Stitches
+    stitches = pattern.get('stitches', [])
+    if all(_is_simple_stitch(s, names) for s in stitches):
+        arrays['stitches'] = np.array(
+            [[[names.index(side['panel']), side['edge']] for side in s] for s in stitches],
+            dtype=np.int64).reshape(-1, 2, 2)
+    else:
+        meta['pattern']['stitches'] = stitches
+
+    arrays['meta'] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+
+    return arrays
+
+
+def arrays_to_spec(arrays):
+    """Convert the dictionary of arrays (e.g. from load_arrays()) back to pattern specification"""
+    spec = json.loads(bytes(np.asarray(arrays['meta'])).decode())
+    pattern = spec.pop('pattern')
+    extras = pattern.pop('panels')
+
+    names = [str(n) for n in arrays['panel_names']]
+    v_off, e_off = arrays['vertex_offsets'], arrays['edge_offsets']
+    panels = {}
+    for i, name in enumerate(names):
+        panel = {
+            'translation': arrays['translations'][i].tolist(),
+            'rotation': arrays['rotations'][i].tolist(),
+            'vertices': arrays['vertices'][v_off[i]:v_off[i + 1]].tolist(),
+            'edges': []
+        }
+        panel_extras = dict(extras.get(name, {}))
+        edge_extras = panel_extras.pop(_EDGES_KEY, {})
+        for j, e_id in enumerate(range(e_off[i], e_off[i + 1])):
+            edge = {'endpoints': arrays['edge_endpoints'][e_id].tolist()}
+            c_type = CURVE_TYPES[arrays['curve_types'][e_id]]
+            if c_type:
+                edge['curvature'] = _decode_curvature(c_type, arrays['curve_params'][e_id])
+            edge.update(edge_extras.get(str(j), {}))
+            panel['edges'].append(edge)
+        panel.update(panel_extras)
+        panels[name] = panel
+
+    pattern['panels'] = panels
+    if 'stitches' not in pattern:
+        pattern['stitches'] = [
+            [{'panel': names[p_id], 'edge': e_id} for p_id, e_id in s.tolist()]
+            for s in arrays['stitches']]
+
+    return {'pattern': pattern, **spec}
+
+
+def save(spec, path):
+    """Save pattern specification to NPZ file"""
+    np.savez(path, **spec_to_arrays(spec))
+
+
+def load_arrays(path, mmap=True):
+    """Load the dictionary of arrays from NPZ file
+
+        * mmap -- if set, arrays are memory-mapped instead of being read from the file
+    """
+    # NOTE: np.load() reads the members one by one (and ignores mmap_mode for NPZ),
+    # but uncompressed members can be taken directly from the file buffer
+    if mmap:
+        raw = np.memmap(path, dtype=np.uint8, mode='r').view(np.ndarray)  # Still backed by the file
+    else:
+        raw = np.fromfile(path, dtype=np.uint8)
+    arrays = {}
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            name = info.filename[:-4]   # Remove .npy
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info))
+                continue
+
+            # Skip the local file header
+            start = info.header_offset
+            name_len, extra_len = raw[start + 26:start + 30].view('<u2')
+            start += 30 + int(name_len) + int(extra_len)
+
+            # .npy header: magic string, version, header length & the header itself
+            major = raw[start + 6]
+            len_bytes = 2 if major == 1 else 4
+            header_len = int(raw[start + 8:start + 8 + len_bytes].view('<u2' if major == 1 else '<u4')[0])
+            header_end = start + 8 + len_bytes + header_len
+            shape, fortran_order, dtype = _parse_npy_header(raw[start:header_end].tobytes())
+            start = header_end
+
+            size = int(np.prod(shape)) * dtype.itemsize
+            array = raw[start:start + size].view(dtype)
+            arrays[name] = array.reshape(shape, order='F' if fortran_order else 'C')
+    return arrays
+
+
+def load(path):
+    """Load pattern specification from NPZ file"""
+    return arrays_to_spec(load_arrays(path, mmap=False))
+
+
+# ------- Utils -------
+@functools.lru_cache(maxsize=1024)
+def _parse_npy_header(header):
+    """Shape, order and dtype of the array from its .npy header
+        NOTE: headers repeat a lot in a dataset, hence the cache"""
+    f = io.BytesIO(header)
+    version = np.lib.format.read_magic(f)
+    read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                   else np.lib.format.read_array_header_2_0)
+    return read_header(f)
+
+
+def _encode_curvature(curvature):
+    """Type & flat parameters of the edge curvature,
+        type is '' if curvature is not given or not supported"""
+    params = np.full(4, np.nan)
+    if not isinstance(curvature, dict) or set(curvature) != {'type', 'params'}:
+        return '', params
+    c_type = curvature['type']
+    if c_type not in _CURVE_PARAMS:
+        return '', params
+    try:
+        values = np.array(curvature['params'], dtype=float)
+    except (TypeError, ValueError):
+        return '', params
+    if values.shape != _CURVE_PARAMS[c_type]:
+        return '', params
+    if c_type == 'circle' and any(not _is_int(v) for v in curvature['params'][1:]):
+        return '', params
+
+    params[:values.size] = values.flatten()
+    return c_type, params
+
+
+def _decode_curvature(c_type, params):
+    size = np.prod(_CURVE_PARAMS[c_type])
+    values = np.asarray(params[:size])
+    if c_type == 'circle':
+        return {'type': c_type, 'params': [float(values[0]), int(values[1]), int(values[2])]}
+    return {'type': c_type, 'params': values.reshape(_CURVE_PARAMS[c_type]).tolist()}
+
+
+def _is_int(value):
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def _is_simple_stitch(stitch, panel_names):
+    return (len(stitch) == 2
+            and all(isinstance(side, dict) and set(side) == {'panel', 'edge'}
+                    and side['panel'] in panel_names and _is_int(side['edge'])
+                    for side in stitch))
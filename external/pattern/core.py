@@ -8,10 +8,17 @@ import errno
 import json
 import numpy as np
 import os
+import pickle
 import random
 
 # My
 from pattern import rotation as rotation_tools
+from pattern import binary
+from pattern import intersect
+
+# Version of the normalized form of pattern specifications (see BasicPattern._normalize_template()),
+# saved as 'normalization_version' property. Increase on changes in normalization
+normalization_version = 1
 
 standard_filenames = [
     'specification',  # e.g. used by dataset generation
@@ -42,6 +49,44 @@ panel_spec_template = {
 }
 
 
+def read_spec(pattern_file):
+    """Read pattern specification from file (JSON or binary NPZ)"""
+    if os.path.splitext(pattern_file)[1] == '.npz':
+        return binary.load(pattern_file)
+    with open(pattern_file, 'r') as f_json:
+        return json.load(f_json)
+
+
+def copy_spec(spec):
+    """Full copy of the pattern specification
+        NOTE: faster than copy.deepcopy() for the nested dictionaries & lists of specifications
+    """
+    return pickle.loads(pickle.dumps(spec, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def write_spec(spec, pattern_file):
+    """Write pattern specification to file (JSON or binary NPZ)"""
+    if os.path.splitext(pattern_file)[1] == '.npz':
+        binary.save(spec, pattern_file)
+    else:
+        with open(pattern_file, 'w') as f_json:
+            json.dump(spec, f_json, indent=2)
+
+
+def is_normalized_spec(spec, check_version=True):
+    """Check if the pattern specification is in the normalized form (see BasicPattern._normalize_template())
+
+        * check_version -- also require the normalization version stamp to be up-to-date
+    """
+    props = spec['properties']
+    return ((not check_version or props.get('normalization_version') == normalization_version)
+            and props.get('curvature_coords') == 'relative'
+            and props.get('units_in_meter') == 100
+            and not props.get('normalize_panel_translation', False)
+            and props.get('normalized_edge_loops', False)
+            and 'panel_order' in spec['pattern'])
+
+
 # ------------ Patterns --------
 class BasicPattern(object):
     """Loading & serializing of a pattern specification in custom JSON format.
@@ -82,38 +127,83 @@ class BasicPattern(object):
             ))
             return
 
-        with open(self.spec_file, 'r') as f_json:
-            self.spec = json.load(f_json)
+        self._set_spec(read_spec(self.spec_file))
+
+    @classmethod
+    def from_spec(cls, spec, name=None, path=None):
+        """Create pattern from specification dictionary (e.g. read from a dataset) 
+            NOTE: spec is used as is, not copied
+        """
+        pattern = cls()
+        pattern.name = name if name is not None else cls.__name__
+        pattern.path = path
+        pattern._set_spec(spec)
+        return pattern
+
+    def _set_spec(self, spec):
+        """Use the given specification as pattern content"""
+        self.spec = spec
         self.pattern = self.spec['pattern']
         self.properties = self.spec['properties']  # mandatory part
 
         # template normalization - panel translations and curvature to relative coords
         self._normalize_template()
 
-    def serialize(self, path, to_subfolder=True, tag='', empty_ok=False):
+    def serialize(self, path, to_subfolder=True, tag='', empty_ok=False, spec_format='json'):
+        """Save the pattern specification
 
-        if not empty_ok and len(self.panel_order()) == 0:
+            * spec_format -- 'json', 'npz' (binary, see pattern.binary) or 'both'
+        """
+        if spec_format not in ['json', 'npz', 'both']:
+            raise ValueError(f'{self.__class__.__name__}::ERROR::Unknown specification format {spec_format}')
+
+        # NOTE: panel order and normalization stamp are saved with the pattern to avoid re-evaluation on load.
+        # They are added to a copy of the specification, the pattern object is not modified
+        spec = self.spec_to_save()
+        if len(spec['pattern']['panel_order']) == 0 and not empty_ok:
             raise RuntimeError(f'{self.__class__.__name__}::ERROR::Asked to save an empty pattern')
 
         # log context
+        log_dir, spec_file = self._serialization_paths(path, to_subfolder, tag, spec_format)
         if to_subfolder:
-            log_dir = os.path.join(path, self.name + '_' + tag)  # NOTE Added change
             try:
                 os.makedirs(log_dir)
             except OSError as e:
                 if e.errno != errno.EEXIST:
                     raise
-            spec_file = os.path.join(log_dir, tag + 'specification.json')
-        else:
-            log_dir = path
-            spec_file = os.path.join(path, (self.name + tag + '_specification.json'))
 
         # Save specification
-        with open(spec_file, 'w') as f_json:
-            json.dump(self.spec, f_json, indent=2)
+        if spec_format in ['json', 'both']:
+            write_spec(spec, os.path.splitext(spec_file)[0] + '.json')
+        if spec_format in ['npz', 'both']:
+            write_spec(spec, os.path.splitext(spec_file)[0] + '.npz')
         
         return log_dir
 
+    def spec_to_save(self):
+        """Shallow copy of the specification with the panel order 
+            and the normalization stamp (if the specification is in the normalized form)
+        """
+        spec = dict(self.spec, pattern=dict(self.pattern), properties=dict(self.properties))
+        if 'panel_order' not in spec['pattern']:
+            spec['pattern']['panel_order'] = self.define_panel_order()
+        if is_normalized_spec(spec, check_version=False):
+            spec['properties']['normalization_version'] = normalization_version
+
+        return spec
+
+    def _serialization_paths(self, path, to_subfolder=True, tag='', spec_format='json'):
+        """Output folder and specification file used by serialize()
+            (.npz if the JSON specification is not saved)"""
+        ext = '.npz' if spec_format == 'npz' else '.json'
+        if to_subfolder:
+            log_dir = os.path.join(path, self.name + '_' + tag)  # NOTE Added change
+            spec_file = os.path.join(log_dir, tag + 'specification' + ext)
+        else:
+            log_dir = path
+            spec_file = os.path.join(path, (self.name + tag + '_specification' + ext))
+        return log_dir, spec_file
+
     @staticmethod
     def name_from_path(pattern_file):
         name = os.path.splitext(os.path.basename(pattern_file))[0]
@@ -123,6 +213,13 @@ class BasicPattern(object):
         return name
 
     # --------- Info ------------------------
+    def is_normalized(self, check_version=True):
+        """Check if the specification is already in the normalized form (see _normalize_template())
+
+            * check_version -- also require the normalization version stamp to be up-to-date
+        """
+        return is_normalized_spec(self.spec, check_version)
+
     def panel_order(self, force_update=False):
         """
             Return current agreed-upon order of panels
@@ -245,7 +342,13 @@ class BasicPattern(object):
             * Converts curvature coordinates to realitive ones (in edge frame) -- for easy length scaling
             * snaps each panel center to (0, 0) if requested in props
             * scales everything to cm
+            * normalizes the edge loops & evaluates the panel order
+
+            Specifications saved in the normalized form (with the current normalization version) are used as is
         """
+        if self.is_normalized():
+            return
+
         if self.properties['curvature_coords'] == 'absolute':
             for panel in self.pattern['panels']:
                 # convert curvature 
@@ -300,6 +403,8 @@ class BasicPattern(object):
         # Recalculate panel order if not given already
         self.panel_order()
 
+        self.properties['normalization_version'] = normalization_version
+
     def _normalize_panel_translation(self, panel_name):
         """ Convert panel vertices to local coordinates: 
             Shifts all panel vertices s.t. origin is at the center of the panel
@@ -474,59 +579,43 @@ class BasicPattern(object):
         """Restores spec structure from given backup copy 
             Makes a full copy of backup to avoid accidential corruption of backup
         """
-        self.spec = copy.deepcopy(backup_copy)
+        self.spec = copy_spec(backup_copy)
         self.pattern = self.spec['pattern']
         self.properties = self.spec['properties']  # mandatory part
 
     # -------- Checks ------------
-    def is_self_intersecting(self):
-        """returns True if any of the pattern panels are self-intersecting"""
-        return any(map(self._is_panel_self_intersecting, self.pattern['panels']))
+    def is_self_intersecting(self, curve_segments=10):
+        """returns True if any of the pattern panels are self-intersecting
+
+            * curve_segments -- number of segments to approximate curved edges with
+        """
+        return self._has_intersections(list(self.pattern['panels'].keys()), curve_segments)
+
+    def self_intersections(self, curve_segments=10):
+        """Intersecting edges of the pattern panels
 
-    def _is_panel_self_intersecting(self, panel_name):
+            Returns dictionary {panel name: [(edge id, edge id), ...]} of the self-intersecting panels
+            (see intersect.intersecting_edges() for the format)
+        """
+        names = list(self.pattern['panels'].keys())
+        found = intersect.intersecting_edges([self.pattern['panels'][n] for n in names], curve_segments)
+        return {names[p_id]: pairs for p_id, pairs in found.items()}
+
+    def _is_panel_self_intersecting(self, panel_name, curve_segments=10):
         """Checks whatever a given panel contains intersecting edges
         """
-        panel = self.pattern['panels'][panel_name]
-        vertices = np.array(panel['vertices'])
+        return self._has_intersections([panel_name], curve_segments)
+
+    def _has_intersections(self, panel_names, curve_segments=10):
+        """Check if any of the given panels have intersecting edges. All panels are processed at once"""
+        segments, panel_ids, _ = intersect.panel_segments(
+            [self.pattern['panels'][n] for n in panel_names], curve_segments)
+        return len(intersect.find_intersections(segments, panel_ids, first_only=True)) > 0
 
-        # construct edge list in coordinates
-        edge_list = []
-        for edge in panel['edges']:
-            edge_ids = edge['endpoints']
-            edge_coords = vertices[edge_ids]
-            if 'curvature' in edge and isinstance(edge['curvature'], list):
-                # NOTE: Legacy curvature representation
-                curv_abs = self._control_to_abs_coord(edge_coords[0], edge_coords[1], edge['curvature'])
-                # view curvy edge as two segments
-                # NOTE this aproximation might lead to False positives in intersection tests
-                edge_list.append([edge_coords[0], curv_abs])
-                edge_list.append([curv_abs, edge_coords[1]])
-            else:
-                edge_list.append(edge_coords.tolist())
-
-        # simple pairwise checks of edges
-        # Follows discussion in  https://math.stackexchange.com/questions/80798/detecting-polygon-self-intersection 
-        for i1 in range(0, len(edge_list)):
-            for i2 in range(i1 + 1, len(edge_list)):
-                if self._is_segm_intersecting(edge_list[i1], edge_list[i2]):
-                    return True
-        
-        return False          
-        
     def _is_segm_intersecting(self, segment1, segment2):
         """Checks wheter two segments intersect 
             in the points interior to both segments"""
-        # https://algs4.cs.princeton.edu/91primitives/
-        def ccw(start, end, point):
-            """A test whether three points form counterclockwize angle (>0) 
-            Returns (<0) if they form clockwize angle
-            0 if collinear"""
-            return (end[0] - start[0]) * (point[1] - start[1]) - (point[0] - start[0]) * (end[1] - start[1])
-
-        if (ccw(segment1[0], segment1[1], segment2[0]) * ccw(segment1[0], segment1[1], segment2[1]) >= 0
-                or ccw(segment2[0], segment2[1], segment1[0]) * ccw(segment2[0], segment2[1], segment1[1]) >= 0):
-            return False
-        return True
+        return intersect.segments_intersect(segment1, segment2)
 
 
 class ParametrizedPattern(BasicPattern):
@@ -576,10 +665,9 @@ class ParametrizedPattern(BasicPattern):
         
         self._update_pattern_by_param_values()
 
-    def reloadJSON(self):
-        """(Re)loads pattern info from spec file. 
-        Useful when spec is updated from outside"""
-        super(ParametrizedPattern, self).reloadJSON()
+    def _set_spec(self, spec):
+        """Use the given specification as pattern content"""
+        super(ParametrizedPattern, self)._set_spec(spec)
 
         self.parameters = self.spec['parameters']
         self._normalize_param_scaling()
@@ -793,14 +881,14 @@ class ParametrizedPattern(BasicPattern):
             if isinstance(value, list):
                 if any(np.isclose(value, 0)):
                     raise ZeroDivisionError('Zero value encountered while restoring multiplicative parameter.')
-                return map(lambda x: 1 / x, value)
+                return [1 / x for x in value]
             else:
                 if np.isclose(value, 0):
                     raise ZeroDivisionError('Zero value encountered while restoring multiplicative parameter.')
                 return 1 / value
         else:
             if isinstance(value, list):
-                return map(lambda x: -x, value)
+                return [-x for x in value]
             else:
                 return -value
 
@@ -916,23 +1004,34 @@ class ParametrizedPattern(BasicPattern):
             print('ParametrizedPattern::Warning::Parameter (& constraints) values are invalidated')
 
     # ---------- Randomization -------------
-    def _randomize_pattern(self):
-        """Robustly randomize current pattern"""
-        # restore template state before making any changes to parameters
-        self._restore_template(params_to_default=False)
+    def _randomize_pattern(self, max_trials=100, template=None):
+        """Robustly randomize current pattern
 
-        spec_backup = copy.deepcopy(self.spec)
-        self._randomize_parameters()
-        self._update_pattern_by_param_values()
-        for _ in range(100):  # upper bound on trials to avoid infinite loop
-            if not self.is_self_intersecting():
-                break
+            * max_trials -- upper bound on trials to avoid infinite loop
+            * template -- specification in the template state (all parameters at defaults), if known,
+                e.g. shared by many patterns randomized from the same template
+
+            Returns the number of trials made and whether the resulting pattern is
+            free of self-intersections (the last trial is kept otherwise)
+        """
+        if template is None:
+            # restore template state before making any changes to parameters
+            self._restore_template(params_to_default=False)
+            template = copy_spec(self.spec)
+        else:
+            self._restore(template)
 
-            print('Warning::Randomized pattern is self-intersecting. Re-try..')
-            self._restore(spec_backup)
-            # Try again
+        for trial in range(1, max_trials + 1):
             self._randomize_parameters()
             self._update_pattern_by_param_values()
+            if not self.is_self_intersecting():
+                return trial, True
+
+            if trial < max_trials:
+                print('Warning::Randomized pattern is self-intersecting. Re-try..')
+                self._restore(template)
+
+        return max_trials, False
 
     def _new_value(self, param_range):
         """Random value within range given as an iteratable"""
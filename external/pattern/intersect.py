@@ -0,0 +1,226 @@
+"""
+    Self-intersection checks of panel outlines
+
+    Edges of the panels (in the specification format) are approximated
+    with straight segments, and all pairs of segments of the same panel
+    are tested for intersection at once with numpy.
+
+    Follows discussion in https://math.stackexchange.com/questions/80798/detecting-polygon-self-intersection
+    NOTE: Segments sharing an endpoint (e.g. neighbours) are not intersecting
+"""
+
+import functools
+import numpy as np
+
+_max_pairs = 2**20    # Max number of segment pairs tested for intersection at once
+
+
+def panel_segments(panels, curve_segments=10):
+    """Approximation of the panel outlines as a set of straight segments
+
+        * panels -- list of panels in the specification format (dicts with 'vertices' and 'edges')
+        * curve_segments -- number of segments to approximate curved edges with
+
+        Returns an array of segments (N x 2 (start, end) x 2 (coords)),
+        the ids of the panels (in the panels list) and
+        the ids of the edges (in the panel) they belong to
+    """
+    # Gather edges by type
+    lines, line_ids = [], []
+    curves = {'quadratic': [], 'cubic': [], 'circle': []}  # (panel id, edge id, start, end, params)
+    for p_id, panel in enumerate(panels):
+        vertices = panel['vertices']
+        for e_id, edge in enumerate(panel['edges']):
+            start, end = vertices[edge['endpoints'][0]], vertices[edge['endpoints'][1]]
+            if 'curvature' not in edge:
+                lines.append([start, end])
+                line_ids.append((p_id, e_id))
+            elif isinstance(edge['curvature'], list):
+                # NOTE: Legacy curvature representation is a control point of a quadratic curve
+                curves['quadratic'].append((p_id, e_id, start, end, [edge['curvature']]))
+            elif edge['curvature']['type'] in curves:
+                curves[edge['curvature']['type']].append(
+                    (p_id, e_id, start, end, edge['curvature']['params']))
+            else:
+                raise NotImplementedError(
+                    f'panel_segments::ERROR::Unknown curvature type {edge["curvature"]["type"]}')
+
+    segments = [np.array(lines, dtype=float).reshape(-1, 2, 2)]
+    ids = [np.array(line_ids, dtype=int).reshape(-1, 2)]
+    t = np.linspace(0, 1, curve_segments + 1)
+    for c_type, c_edges in curves.items():
+        if not c_edges:
+            continue
+        p_ids, e_ids, starts, ends, params = zip(*c_edges)
+        points = _curve_points(
+            c_type, np.array(starts, dtype=float), np.array(ends, dtype=float),
+            np.array(params, dtype=float), t)
+        segments.append(np.stack([points[:, :-1], points[:, 1:]], axis=2).reshape(-1, 2, 2))
+        ids.append(np.repeat(np.stack([p_ids, e_ids], axis=-1), curve_segments, axis=0))
+
+    ids = np.concatenate(ids)
+    return np.concatenate(segments), ids[:, 0], ids[:, 1]
+
+
+def intersecting_edges(panels, curve_segments=10, first_only=False):
+    """Intersecting edges of the panels (in the specification format)
+
+        * curve_segments -- number of segments to approximate curved edges with
+        * first_only -- stop after the first found intersections
+
+        Returns dictionary {panel id: [(edge id, edge id), ...]} of the self-intersecting panels
+        with the ids of the panels in the panels list and of the edges in the panel.
+        Every pair is listed once with the smaller id first, the pairs are sorted
+        NOTE: Pair of the same ids means a curved edge intersecting itself
+    """
+    segments, panel_ids, edge_ids = panel_segments(panels, curve_segments)
+    pairs = find_intersections(segments, panel_ids, first_only=first_only)
+
+    out = {}
+    for i, j in pairs:
+        edge_pair = tuple(sorted((int(edge_ids[i]), int(edge_ids[j]))))
+        out.setdefault(int(panel_ids[i]), set()).add(edge_pair)
+    return {p_id: sorted(edge_pairs) for p_id, edge_pairs in sorted(out.items())}
+
+
+def find_intersections(segments, group_ids, first_only=False):
+    """Pairs of intersecting segments within the same groups (e.g. panels)
+
+        * segments -- N x 2 x 2 array of segments
+        * group_ids -- ids of the groups of the segments (N)
+        * first_only -- stop after the first found intersections
+            (for a quick yes/no check)
+
+        Returns K x 2 array of the ids of the intersecting segments (i < j)
+    """
+    segments, group_ids = np.asarray(segments, dtype=float), np.asarray(group_ids)
+    if len(segments) < 2:
+        return np.empty((0, 2), dtype=int)
+
+    order = np.argsort(group_ids, kind='stable')
+    segments = segments[order]
+    low, high = segments.min(axis=1), segments.max(axis=1)
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(group_ids[order])) + 1, [len(segments)]])
+
+    found = [np.empty((0, 2), dtype=int)]
+    for ids1, ids2 in _pair_chunks(bounds):
+        found.append(_intersecting_pairs(segments, low, high, ids1, ids2))
+        if first_only and len(found[-1]):
+            break
+
+    return np.sort(order[np.concatenate(found)], axis=1)
+
+
+def segments_intersect(segment1, segment2):
+    """Checks wheter two segments intersect
+        in the points interior to both segments
+
+        NOTE: Accepts arrays of segments (N x 2 x 2) for batched checks
+    """
+    segment1, segment2 = np.asarray(segment1, dtype=float), np.asarray(segment2, dtype=float)
+    # https://algs4.cs.princeton.edu/91primitives/
+    def ccw(start, end, point):
+        """A test whether three points form counterclockwize angle (>0)
+        Returns (<0) if they form clockwize angle
+        0 if collinear"""
+        return ((end[..., 0] - start[..., 0]) * (point[..., 1] - start[..., 1])
+                - (point[..., 0] - start[..., 0]) * (end[..., 1] - start[..., 1]))
+
+    s1_start, s1_end = segment1[..., 0, :], segment1[..., 1, :]
+    s2_start, s2_end = segment2[..., 0, :], segment2[..., 1, :]
+    return ((ccw(s1_start, s1_end, s2_start) * ccw(s1_start, s1_end, s2_end) < 0)
+            & (ccw(s2_start, s2_end, s1_start) * ccw(s2_start, s2_end, s1_end) < 0))
+
+
+# ------- Utils -------
+def _intersecting_pairs(segments, low, high, ids1, ids2):
+    """Intersecting ones among the given pairs of segments (K x 2 array)"""
+    # Bounding boxes pruning
+    overlap = np.all((low[ids1] <= high[ids2]) & (low[ids2] <= high[ids1]), axis=-1)
+    ids1, ids2 = ids1[overlap], ids2[overlap]
+
+    hits = segments_intersect(segments[ids1], segments[ids2])
+    return np.stack([ids1[hits], ids2[hits]], axis=-1)
+
+
+def _pair_chunks(bounds):
+    """Pairs of segments within the groups [bounds[i], bounds[i + 1])
+        in chunks of about _max_pairs pairs"""
+    pairs, n_pairs = [], 0
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        for ids1, ids2 in _segment_pairs(end - start):
+            pairs.append((ids1 + start, ids2 + start))
+            n_pairs += len(ids1)
+            if n_pairs > _max_pairs:  # Limit the memory use
+                yield np.concatenate([p[0] for p in pairs]), np.concatenate([p[1] for p in pairs])
+                pairs, n_pairs = [], 0
+    if pairs:
+        yield np.concatenate([p[0] for p in pairs]), np.concatenate([p[1] for p in pairs])
+
+
+def _segment_pairs(n):
+    """All pairs of n segments (i < j) in chunks of limited size"""
+    if n * (n - 1) // 2 <= _max_pairs:
+        yield _all_pairs(n)
+        return
+    rows = max(1, _max_pairs // n)
+    for i in range(0, n - 1, rows):
+        ids1, ids2 = np.nonzero(
+            np.arange(n)[None, :] > np.arange(i, min(i + rows, n))[:, None])
+        yield ids1 + i, ids2
+
+
+@functools.lru_cache(maxsize=256)
+def _all_pairs(n):
+    return np.triu_indices(n, k=1)
+
+
+def _curve_points(c_type, starts, ends, params, t):
+    """Points on the curved edges of the same type (N) at parameter values t (K)
+
+        Returns N x K x 2 array
+    """
+    edges = ends - starts
+    perps = np.stack([-edges[:, 1], edges[:, 0]], axis=-1)
+    starts, ends, t = starts[:, None], ends[:, None], t[None, :, None]
+
+    def control_points(scales):
+        """Batched BasicPattern._control_to_abs_coord()"""
+        return (starts[:, 0] + scales[:, 0:1] * edges + scales[:, 1:2] * perps)[:, None]
+
+    if c_type == 'quadratic':
+        control = control_points(params[:, 0])
+        return (1 - t)**2 * starts + 2 * (1 - t) * t * control + t**2 * ends
+
+    if c_type == 'cubic':
+        cp1, cp2 = control_points(params[:, 0]), control_points(params[:, 1])
+        return ((1 - t)**3 * starts + 3 * (1 - t)**2 * t * cp1
+                + 3 * (1 - t) * t**2 * cp2 + t**3 * ends)
+
+    if c_type == 'circle':
+        radius, large_arc, right = params[:, 0], params[:, 1], params[:, 2]
+        # Middle of the arc in relative coordinates (as in pygarment.CircleEdge)
+        str_dist = np.linalg.norm(edges, axis=-1)
+        center_dist = np.sqrt(np.maximum(radius**2 - str_dist**2 / 4, 0))
+        mid_y = np.where(large_arc > 0, radius + center_dist, radius - center_dist) / str_dist
+        mid_y *= np.where(right > 0, -1, 1)
+
+        mids = control_points(np.stack([np.full_like(mid_y, 0.5), mid_y], axis=-1))[:, 0]
+        normals = perps / str_dist[:, None]
+        centers = ((starts[:, 0] + ends[:, 0]) / 2
+                   + normals * (np.sign(mid_y) * (np.abs(mid_y) * str_dist - radius))[:, None])
+
+        # Sweep from start to end through the middle of the arc
+        def angle(points):
+            vec = points - centers
+            return np.arctan2(vec[:, 1], vec[:, 0])
+        angle_start, angle_mid, angle_end = angle(starts[:, 0]), angle(mids), angle(ends[:, 0])
+        sweep = (angle_end - angle_start) % (2 * np.pi)
+        sweep = np.where((angle_mid - angle_start) % (2 * np.pi) > sweep, sweep - 2 * np.pi, sweep)
+
+        angles = angle_start[:, None] + t[..., 0] * sweep[:, None]
+        points = centers[:, None] + radius[:, None, None] * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+        points[:, 0], points[:, -1] = starts[:, 0], ends[:, 0]   # exact endpoints
+        return points
+
+    raise NotImplementedError(f'_curve_points::ERROR::Unknown curvature type {c_type}')
@@ -0,0 +1,217 @@
+"""
+    Sharded storage of pattern datasets
+
+    Instead of a folder with a few small files per pattern, the files of many
+    patterns are packed one after another into shard files of a limited size:
+        <path>/shard_00000.bin, <path>/shard_00001.bin, ...
+    <path>/manifest.jsonl lists the stored patterns, one JSON record per line:
+        {"name": <pattern name>, "shard": <shard id>, "files": {<filename>: [<offset>, <size>], ...}}
+
+    The manifest is appended after the pattern data is written, hence
+    writing can be resumed after an interruption (incomplete records are discarded).
+"""
+
+import io
+import json
+import os
+from pathlib import Path
+import numpy as np
+
+from pattern import binary
+
+MANIFEST = 'manifest.jsonl'
+
+
+class ShardWriter():
+    """Append patterns to the sharded dataset at path (created if needed)
+
+        Example:
+            with ShardWriter('Logs/dataset') as writer:
+                writer.add_pattern(pattern, with_images=True)
+                writer.add('other_pattern', {'specification.json': spec_bytes})
+
+        * shard_size -- approximate max size of a shard file in bytes
+    """
+    def __init__(self, path, shard_size=256 * 2**20) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.shard_size = shard_size
+
+        self.index = _read_manifest(self.path / MANIFEST)
+        _drop_incomplete_line(self.path / MANIFEST)
+
+        # Continue writing after the last complete record
+        ends = {}
+        for record in self.index.values():
+            end = max([off + size for off, size in record['files'].values()], default=0)
+            ends[record['shard']] = max(ends.get(record['shard'], 0), end)
+        self.shard_id = max(ends, default=0)
+        shard_file = _shard_filename(self.path, self.shard_id)
+        if shard_file.exists():
+            os.truncate(shard_file, ends.get(self.shard_id, 0))
+
+        self._shard = open(shard_file, 'ab')
+        self._manifest = open(self.path / MANIFEST, 'a')
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, name, files):
+        """Add a pattern given as a dictionary of files {filename: content (bytes or str)}
+            NOTE: a pattern with the same name stored before is replaced
+        """
+        if self._shard.tell() >= self.shard_size:
+            self._next_shard()
+
+        record = {'name': name, 'shard': self.shard_id, 'files': {}}
+        for filename, content in files.items():
+            if isinstance(content, str):
+                content = content.encode()
+            record['files'][filename] = [self._shard.tell(), len(content)]
+            self._shard.write(content)
+        self._shard.flush()
+
+        self._manifest.write(json.dumps(record) + '\n')
+        self._manifest.flush()
+        self.index[name] = record
+
+    def add_pattern(
+            self, pattern, extra_files={},
+            spec_format='json', with_images=True, with_text=True, view_ids=True):
+        """Add pattern object with its specification & images (for VisPattern objects)
+
+            * extra_files -- other files to store with the pattern, e.g. {'design_params.yaml': ...}
+            * spec_format -- 'json', 'npz' or 'both', see BasicPattern.serialize()
+            * with_images -- store svg & png images of the pattern
+        """
+        self.add(pattern.name, pattern_files(pattern, extra_files, spec_format, with_images, with_text, view_ids))
+
+    def close(self):
+        self._shard.close()
+        self._manifest.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _next_shard(self):
+        self._shard.close()
+        self.shard_id += 1
+        # NOTE: overwrite leftovers of interrupted writing (if any)
+        self._shard = open(_shard_filename(self.path, self.shard_id), 'wb')
+
+
+class ShardReader():
+    """Random access to the patterns of the sharded dataset by name
+
+        Example:
+            reader = ShardReader('Logs/dataset')
+            for name in reader.names():
+                spec = reader.spec(name)
+                png = reader.read(name, 'pattern.png')
+    """
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+        self.index = _read_manifest(self.path / MANIFEST)
+        self._shards = {}
+
+    def names(self):
+        return list(self.index.keys())
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def files(self, name):
+        """Names of the files stored for the pattern"""
+        return list(self.index[name]['files'].keys())
+
+    def read(self, name, filename):
+        """Content (bytes) of the file of a pattern"""
+        record = self.index[name]
+        offset, size = record['files'][filename]
+        return self._shard(record['shard'])[offset:offset + size].tobytes()
+
+    def spec(self, name):
+        """Pattern specification dictionary"""
+        record = self.index[name]
+        if 'specification.json' in record['files']:
+            return json.loads(self.read(name, 'specification.json'))
+        with np.load(io.BytesIO(self.read(name, 'specification.npz'))) as data:
+            return binary.arrays_to_spec(data)
+
+    def _shard(self, shard_id):
+        """Memory-mapped shard file"""
+        if shard_id not in self._shards:
+            self._shards[shard_id] = np.memmap(
+                _shard_filename(self.path, shard_id), dtype=np.uint8, mode='r')
+        return self._shards[shard_id]
+
+
+def pattern_files(
+        pattern, extra_files={},
+        spec_format='json', with_images=True, with_text=True, view_ids=True):
+    """Dictionary of files representing the pattern for ShardWriter.add()
+        (e.g. to be created in worker processes)"""
+    if spec_format not in ['json', 'npz', 'both']:
+        raise ValueError(f'ShardWriter::ERROR::Unknown specification format {spec_format}')
+
+    files = {}
+    spec = pattern.spec_to_save()
+    if spec_format in ['json', 'both']:
+        files['specification.json'] = json.dumps(spec)
+    if spec_format in ['npz', 'both']:
+        data = io.BytesIO()
+        np.savez(data, **binary.spec_to_arrays(spec))
+        files['specification.npz'] = data.getvalue()
+
+    if with_images and len(pattern.panel_order()) > 0:
+        files['pattern.svg'], files['pattern.png'] = pattern.render(with_text, view_ids)
+    files.update(extra_files)
+
+    return files
+
+
+# ------- Utils -------
+def _shard_filename(path, shard_id):
+    return Path(path) / f'shard_{shard_id:05d}.bin'
+
+
+def _read_manifest(manifest_file):
+    """Pattern name -> record of the last complete entry"""
+    index = {}
+    if not os.path.exists(manifest_file):
+        return index
+
+    shard_sizes = {}
+    with open(manifest_file, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:   # Interrupted write
+                continue
+            shard = record['shard']
+            if shard not in shard_sizes:
+                shard_file = _shard_filename(os.path.dirname(manifest_file), shard)
+                shard_sizes[shard] = shard_file.stat().st_size if shard_file.exists() else -1
+            end = max([off + size for off, size in record['files'].values()], default=0)
+            if end <= shard_sizes[shard]:
+                index[record['name']] = record
+    return index
+
+
+def _drop_incomplete_line(manifest_file):
+    """Remove the last line of the manifest if its writing was interrupted"""
+    if not os.path.exists(manifest_file):
+        return
+    with open(manifest_file, 'rb+') as f:
+        content = f.read()
+        if content and not content.endswith(b'\n'):
+            f.truncate(content.rfind(b'\n') + 1)
@@ -0,0 +1,125 @@
+"""
+    Streaming of the patterns from datasets
+
+    Patterns are read (and normalized) lazily by a background thread
+    a few steps ahead of the consumer, s.t. the whole dataset never
+    has to be loaded in memory.
+
+    Both layouts of the datasets are supported:
+        * folders with the specification files (JSON or NPZ) anywhere in the directory tree
+        * sharded datasets (see pattern.shards)
+"""
+
+import os
+import queue
+import threading
+
+from pattern import core
+from pattern.shards import ShardReader, MANIFEST
+
+FIELDS = ['panels', 'stitches', 'parameters', 'properties']
+
+
+def spec_files(path):
+    """Specification files in the directory tree (lazily, in a stable order)
+        NOTE: NPZ duplicates of JSON specifications are skipped
+    """
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith('specification.json'):
+                yield os.path.join(root, filename)
+            elif filename.endswith('specification.npz') and filename[:-4] + '.json' not in files:
+                yield os.path.join(root, filename)
+
+
+def read_specs(path):
+    """(name, specification dictionary) for every pattern in the dataset"""
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        reader = ShardReader(path)
+        for name in reader.names():
+            if any(f.startswith('specification') for f in reader.files(name)):
+                yield name, reader.spec(name)
+    else:
+        for spec_file in spec_files(path):
+            yield _pattern_name(spec_file), core.read_spec(spec_file)
+
+
+def _pattern_name(spec_file):
+    """Name of the pattern saved in the specification file,
+        s.t. folder datasets use the same names as the sharded ones
+        (<name>_specification.json -> <name>)
+    """
+    name = core.BasicPattern.name_from_path(spec_file)
+    suffix = '_specification'
+    return name[:-len(suffix)] if name.endswith(suffix) else name
+
+
+def stream_patterns(path, fields=None, prefetch=16, pattern_class=core.ParametrizedPattern):
+    """Iterate over the patterns of the dataset
+
+        * fields -- if given, yield dictionaries with the pattern name and only the
+            requested parts of the (normalized) specification (see FIELDS)
+            instead of the pattern objects
+        * prefetch -- max number of patterns loaded ahead of the consumer
+        * pattern_class -- type of the pattern objects to create, e.g. VisPattern
+
+        Example:
+            for pattern in stream_patterns('Logs/dataset', fields=['panels']):
+                print(pattern['name'], len(pattern['panels']))
+    """
+    if fields is not None:
+        unknown = [f for f in fields if f not in FIELDS]
+        if unknown:
+            raise ValueError(f'stream_patterns::ERROR::Unknown fields {unknown}. Use any of {FIELDS}')
+
+    def load(name, spec):
+        pattern = pattern_class.from_spec(spec, name=name, path=path)
+        if fields is None:
+            return pattern
+        out = {'name': name}
+        for field in fields:
+            out[field] = pattern.spec[field] if field in ['parameters', 'properties'] else pattern.pattern[field]
+        return out
+
+    yield from _prefetched((load(name, spec) for name, spec in read_specs(path)), prefetch)
+
+
+def _prefetched(iterable, size):
+    """Evaluate the iterable in a background thread keeping up to size items ready"""
+    items = queue.Queue(maxsize=max(size, 1))
+    stop = threading.Event()
+    done = object()
+
+    def put(item, error=None):
+        while not stop.is_set():
+            try:
+                items.put((item, error), timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(done)
+        except Exception as e:
+            put(done, e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        # The consumer may stop early
+        stop.set()
+        thread.join()
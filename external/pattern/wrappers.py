@@ -1,10 +1,12 @@
 """
     To be used in Python 3.6+ due to dependencies
 """
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from copy import copy
 import random
 import string
 import os
+import time
 import numpy as np
 from scipy.spatial.transform import Rotation as R
 
@@ -16,15 +18,15 @@ if 'Windows' in os.environ.get('OS',''):
     dir_path = os.path.dirname(os.path.realpath(__file__))
     os.environ['path'] += f';{os.path.abspath(dir_path + "/cairo_dlls/")}'
 
-import cairosvg
+# NOTE: cairosvg and matplotlib are imported on first use:
+# they are slow to load and not needed unless the patterns are rendered
 import svgpathtools as svgpath
 
-import matplotlib.pyplot as plt
-
 # my
 import customconfig
 from pattern import core
 from pattern.utils import *
+from pattern import rotation as rotation_tools
 
 
 class VisPattern(core.ParametrizedPattern):
@@ -54,23 +56,50 @@ class VisPattern(core.ParametrizedPattern):
     def serialize(
             self, path, to_subfolder=True, tag='', 
             with_3d=True, with_text=True, view_ids=True, 
-            empty_ok=False):
+            empty_ok=False, render=True, render_queue=None, spec_format='json'):
+        """Save the pattern specification and its visualizations
+
+            * render -- if False, only the specification is saved. 
+                The images can be created later with render_spec() or render_missing()
+            * render_queue -- RenderQueue to create the images in the background 
+                instead of waiting for them
+            * with_3d -- visualization of the 3D placement of the panels: 
+                True or 'matplotlib' for 3D plot, 'fast' for lightweight 
+                orthographic projection of panel outlines, False to skip
+            * spec_format -- 'json', 'npz' or 'both', see BasicPattern.serialize()
+        """
 
-        log_dir = super().serialize(path, to_subfolder, tag=tag, empty_ok=empty_ok)
+        log_dir = super().serialize(path, to_subfolder, tag=tag, empty_ok=empty_ok, spec_format=spec_format)
         if len(self.panel_order()) == 0:  # If we are still here, but pattern is empty, don't generate an image
             return log_dir
+        if not render:
+            return log_dir
+
+        _, spec_file = self._serialization_paths(path, to_subfolder, tag, spec_format)
+        if render_queue is not None:
+            render_queue.submit(spec_file, with_3d=with_3d, with_text=with_text, view_ids=view_ids)
+            return log_dir
         
-        svg_file = os.path.join(log_dir, (self.name + tag + '_pattern.svg'))
-        png_file = os.path.join(log_dir, (self.name + tag + '_pattern.png')) 
-        png_3d_file = os.path.join(log_dir, (self.name + tag + '_3d_pattern.png'))
+        svg_file, png_file, png_3d_file = image_filenames(spec_file)
 
         # save visualtisation
         self._save_as_image(svg_file, png_file, with_text, view_ids)
         if with_3d:
-            self._save_as_image_3D(png_3d_file)
+            self._save_3d_preview(png_3d_file, with_3d)
             
         return log_dir
 
+    def render(self, with_text=True, view_ids=True, margin=2):
+        """Render the current pattern in memory
+
+            Returns the SVG representation (str) and PNG image (bytes)
+            with the same conventions as in serialize()
+        """
+        dwg = self._draw_svg(with_text, view_ids, margin)
+        svg = dwg.tostring()
+
+        return svg, self._svg_to_png(svg_string=svg)
+
     # -------- Drawing ---------
 
     def _verts_to_px_coords(self, vertices, translation_2d):
@@ -227,6 +256,35 @@ class VisPattern(core.ParametrizedPattern):
             * margin: small amount of free space around the svg drawing (to correctly display the line width)
 
         """
+        dwg = self._draw_svg(with_text, view_ids, margin, svg_filename)
+        dwg.save(pretty=True)
+
+        # to png
+        self._svg_to_png(svg_filename=svg_filename, png_filename=png_filename)
+
+    def _svg_to_png(self, svg_filename=None, svg_string=None, png_filename=None):
+        """Convert svg image (file or string) to png. 
+            Returns png image bytes if png_filename is not given
+        """
+        # NOTE: Assuming the pattern uses cm
+        # 3 px == 1 cm
+        # DPI = 96 (default) px/inch == 96/2.54 px/cm
+        import cairosvg
+        return cairosvg.svg2png(
+            url=svg_filename, 
+            bytestring=svg_string.encode() if svg_string is not None else None, 
+            write_to=png_filename, dpi=2.54*self.px_per_unit)
+
+    def _draw_svg(self, with_text=True, view_ids=True, margin=2, svg_filename=None):
+        """Create svg drawing of the current pattern
+
+            * with_text: include panel names
+            * view_ids: include ids of vertices and edges in the output image
+            * margin: small amount of free space around the svg drawing (to correctly display the line width)
+            * svg_filename: target file for saving the drawing
+
+            Returns svgwrite.Drawing object
+        """
         # Get svg representation per panel
         # Order by depth (=> most front panels render in front)
         panel_order = self.panel_order()
@@ -279,7 +337,8 @@ class VisPattern(core.ParametrizedPattern):
             paths, 
             attributes=attributes, 
             margin_size=0,
-            filename=svg_filename, 
+            # NOTE: svgpathtools requires a filename even if the drawing is not saved
+            filename=svg_filename if svg_filename is not None else self.name + '_pattern.svg', 
             viewbox=viewbox, 
             dimensions=[str(viewbox[2]) + 'cm', str(viewbox[3]) + 'cm'],
             paths2Drawing=True)
@@ -291,18 +350,93 @@ class VisPattern(core.ParametrizedPattern):
                 if panel is not None:
                     self._add_panel_annotations(
                         dwg, panel, paths[i], with_text, view_ids)
-        
-        dwg.save(pretty=True)
 
-        # to png
-        # NOTE: Assuming the pattern uses cm
-        # 3 px == 1 cm
-        # DPI = 96 (default) px/inch == 96/2.54 px/cm
-        cairosvg.svg2png(
-            url=svg_filename, write_to=png_filename, dpi=2.54*self.px_per_unit)
-        
+        return dwg
+
+    def _save_3d_preview(self, png_filename, method=True):
+        """Save visualization of the 3D placement of the panels with the chosen method
+            (see serialize())"""
+        if method == 'fast':
+            self._save_as_image_3D_fast(png_filename)
+        elif method is True or method == 'matplotlib':
+            self._save_as_image_3D(png_filename)
+        else:
+            raise ValueError(f'{self.__class__.__name__}::Error::Unknown 3D visualization type {method}')
+
+    def _save_as_image_3D_fast(self, png_filename, size=512, margin=8):
+        """Save the panel outlines in 3D as seen by an orthographic camera
+            (same view as in _save_as_image_3D()) without the overhead of matplotlib
+
+            * size -- size of the image (largest side) in px
+        """
+        panels = [self.pattern['panels'][name] for name in self.pattern['panels']]
+        verts = [np.asarray(p['vertices'], dtype=float) for p in panels]
+        rotations = np.stack([
+            np.asarray(rotation_tools.euler_xyz_to_R(p['rotation'])) for p in panels])
+        translations = np.array([p['translation'] for p in panels], dtype=float)
+
+        # Panel-to-screen transforms: panel vertices are in the local XY plane
+        view = self._view_axes(elev=115, azim=-59, roll=30)
+        proj = np.einsum('ij,njk->nik', view, rotations[:, :, :2])  # N x 2 x 2
+        offsets = translations @ view.T
+
+        # All the vertices at once
+        panel_ids = np.repeat(np.arange(len(panels)), [len(v) for v in verts])
+        screen = np.einsum('nij,nj->ni', proj[panel_ids], np.concatenate(verts)) + offsets[panel_ids]
+        screen[:, 1] *= -1   # Y looks down in images
+
+        low, high = screen.min(axis=0), screen.max(axis=0)
+        scale = (size - 2 * margin) / max((high - low).max(), 1e-6)
+        screen = (screen - low) * scale + margin
+        width, height = np.ceil((high - low) * scale + 2 * margin).astype(int)
+
+        # Draw
+        outlines = np.split(screen[:, 0] + 1j * screen[:, 1], np.cumsum([len(v) for v in verts])[:-1])
+        paths = [svgpath.polygon(*outline) for outline in outlines]
+        colors = [self._preview_colors[i % len(self._preview_colors)] for i in range(len(paths))]
+        dwg = svgpath.wsvg(
+            paths, 
+            colors=colors,
+            stroke_widths=[1.5] * len(paths),
+            margin_size=0,
+            filename=png_filename,
+            viewbox=(0, 0, width, height),
+            dimensions=[str(width), str(height)],
+            paths2Drawing=True)
+        dwg.add(dwg.rect(insert=(0, 0), size=(width, height), fill='white'))
+        dwg.elements.insert(1, dwg.elements.pop())   # Background is drawn first
+
+        import cairosvg
+        cairosvg.svg2png(bytestring=dwg.tostring().encode(), write_to=png_filename)
+
+    # Default matplotlib colors
+    _preview_colors = [
+        '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', 
+        '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+    @staticmethod
+    def _view_axes(elev, azim, roll):
+        """Screen axes (right, up) in world coordinates of a camera 
+            with the given orientation (in degrees, as in matplotlib's view_init()) 
+
+            Returns 2 x 3 projection matrix
+        """
+        elev, azim, roll = np.deg2rad([elev, azim, roll])
+        eye = np.array([np.cos(elev) * np.cos(azim), np.cos(elev) * np.sin(azim), np.sin(elev)])
+        up = np.array([0, 0, -1 if abs(elev) > np.pi / 2 else 1])
+
+        right = np.cross(up, eye)
+        right /= np.linalg.norm(right)
+        screen_up = np.cross(eye, right)
+        if roll:
+            roll_rot = R.from_rotvec(-roll * eye).as_matrix()
+            right, screen_up = roll_rot @ right, roll_rot @ screen_up
+
+        return np.stack([right, screen_up])
+
     def _save_as_image_3D(self, png_filename):
         """Save the patterns with 3D positioning using matplotlib visualization"""
+        import matplotlib.pyplot as plt
 
         fig = plt.figure(figsize=(30 / 2.54, 30 / 2.54))
         ax = fig.add_subplot(projection='3d')
@@ -330,6 +464,117 @@ class VisPattern(core.ParametrizedPattern):
         plt.close(fig)  # Cleanup
 
 
+# -------- Deferred rendering ---------
+
+def image_filenames(spec_file):
+    """Paths to the images (svg, png, 3D png) of the pattern 
+        serialized to spec_file by VisPattern.serialize()"""
+    folder, filename = os.path.split(spec_file)
+    stem = os.path.splitext(filename)[0][:-len('specification')]
+    
+    # VisPattern.serialize(to_subfolder=True) -> <name>_<tag>/<tag>specification.json
+    # otherwise -> <name><tag>_specification.json
+    folder_name = os.path.basename(folder)
+    if folder_name.endswith('_' + stem):
+        prefix = folder_name[:-len(stem) - 1] + stem
+    else:
+        prefix = stem[:-1]  # Remove '_'
+
+    return (os.path.join(folder, prefix + '_pattern.svg'), 
+            os.path.join(folder, prefix + '_pattern.png'),
+            os.path.join(folder, prefix + '_3d_pattern.png'))
+
+
+def render_spec(spec_file, with_3d=True, with_text=True, view_ids=True):
+    """Create the images of the pattern serialized to spec_file 
+        (when they were skipped or deferred in VisPattern.serialize())
+
+        Returns path to the png image
+    """
+    svg_file, png_file, png_3d_file = image_filenames(spec_file)
+
+    pattern = VisPattern(spec_file)
+    pattern._save_as_image(svg_file, png_file, with_text, view_ids)
+    if with_3d:
+        pattern._save_3d_preview(png_3d_file, with_3d)
+
+    return png_file
+
+
+class RenderQueue():
+    """Pool of worker processes creating the images of the serialized patterns
+        in the background 
+
+        Example:
+            with RenderQueue() as queue:
+                for pattern in patterns:
+                    pattern.serialize(path, render_queue=queue)
+            # All images are ready here
+
+        * workers -- number of worker processes (number of CPUs by default)
+    """
+    def __init__(self, workers=None) -> None:
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.jobs = {}   # future -> spec file
+
+    def submit(self, spec_file, with_3d=True, with_text=True, view_ids=True):
+        """Add rendering of the pattern serialized to spec_file to the queue"""
+        future = self.pool.submit(render_spec, str(spec_file), with_3d, with_text, view_ids)
+        self.jobs[future] = str(spec_file)
+        return future
+
+    def wait(self):
+        """Wait for all the submitted jobs to finish
+
+            Returns the list of spec files that failed to render
+        """
+        fails = []
+        for future in as_completed(self.jobs):
+            if future.exception() is not None:
+                print(f'{self.__class__.__name__}::ERROR::Rendering of '
+                      f'{self.jobs[future]} failed: {future.exception()}')
+                fails.append(self.jobs[future])
+        self.jobs = {}
+        return fails
+
+    def shutdown(self):
+        fails = self.wait()
+        self.pool.shutdown()
+        return fails
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def render_missing(path, with_3d=False, with_text=True, view_ids=True, workers=None):
+    """Create images for all the serialized patterns in the directory tree
+        that don't have them yet
+
+        Returns the lists of rendered and failed spec files
+    """
+    missing = []
+    for root, _, files in os.walk(path):
+        for filename in sorted(files):
+            if not (filename.endswith('specification.json') or filename.endswith('specification.npz')):
+                continue
+            if filename.endswith('.npz') and filename[:-4] + '.json' in files:
+                continue   # The same pattern
+            spec_file = os.path.join(root, filename)
+            _, png_file, png_3d_file = image_filenames(spec_file)
+            if not os.path.exists(png_file) or (with_3d and not os.path.exists(png_3d_file)):
+                missing.append(spec_file)
+    
+    with RenderQueue(workers) as queue:
+        for spec_file in missing:
+            queue.submit(spec_file, with_3d, with_text, view_ids)
+        fails = queue.wait()
+    
+    return [s for s in missing if s not in fails], fails
+
+
 class RandomPattern(VisPattern):
     """
         Parameter randomization of a pattern template in custom JSON format.
@@ -349,16 +594,55 @@ class RandomPattern(VisPattern):
     """
 
     # ------------ Interface -------------
-    def __init__(self, template_file):
+    def __init__(self, template_file=None, max_trials=100):
         """Note that this class requires some input file: 
-            there is not point of creating this object with empty pattern"""
-        super().__init__(template_file, view_ids=False)  # don't show ids for datasets
+            there is not point of creating this object with empty pattern
+            (except for filling it with from_spec())
+
+            * max_trials -- max number of randomization attempts to get a pattern without self-intersections
+        """
+        super().__init__(template_file)
+
+        # Randomization statistics
+        self.trials, self.valid = 0, False
+
+        if template_file is not None:
+            # update name for a random pattern
+            self.name = self.name + '_' + self._id_generator()
+
+            # randomization setup
+            self.trials, self.valid = self._randomize_pattern(max_trials)
+
+    @staticmethod
+    def batch(template_file, n, workers=None, seed=None, max_trials=100, save_to=None, **save_args):
+        """Generate n random patterns from the template in parallel processes
+
+            The template is loaded & normalized only once. Workers receive it on start-up
+            (inherited copy-on-write on systems that fork the processes) instead of re-loading
+            it for every sample
 
-        # update name for a random pattern
-        self.name = self.name + '_' + self._id_generator()
+            * workers -- number of worker processes (number of CPUs by default)
+            * seed -- if given, the samples are reproducible independently of the number of workers
+            * max_trials -- max number of randomization attempts per sample
+            * save_to -- if given, the patterns are saved to this folder by the workers
+                with VisPattern.serialize(save_to, **save_args) instead of being returned
 
-        # randomization setup
-        self._randomize_pattern()
+            Returns the list of patterns (or the paths to the saved patterns) and
+            the list of per-sample statistics {'name', 'trials', 'valid', 'time'}
+        """
+        template = VisPattern(template_file)
+        template._restore_template(params_to_default=False)
+
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_random_worker,
+                initargs=(template.spec, template.name, template.path)) as pool:
+            results = list(pool.map(
+                _random_sample, range(n),
+                [(seed, max_trials, save_to, save_args)] * n,
+                chunksize=max(1, n // (workers * 4))))
+
+        return [r[0] for r in results], [r[1] for r in results]
 
     # -------- Other Utils ---------
     def _id_generator(self, size=10,
@@ -369,6 +653,34 @@ class RandomPattern(VisPattern):
         return ''.join(random.choices(chars, k=size))
 
 
+# ----- Batch randomization workers -----
+_template = None   # (spec, name, path) of the template in the current process
+
+
+def _init_random_worker(spec, name, path):
+    global _template
+    _template = spec, name, path
+    random.seed()   # NOTE: Forked processes inherit the same random state
+
+
+def _random_sample(i, config):
+    """Randomize the i-th sample from the template of the current process"""
+    seed, max_trials, save_to, save_args = config
+    spec, name, path = _template
+    if seed is not None:
+        random.seed(f'{seed}_{i}')
+
+    start_time = time.time()
+    pattern = RandomPattern.from_spec(core.copy_spec(spec), name=name, path=path)
+    pattern.name = name + '_' + pattern._id_generator()
+    pattern.trials, pattern.valid = pattern._randomize_pattern(max_trials, template=spec)
+    stats = {'name': pattern.name, 'trials': pattern.trials, 'valid': pattern.valid, 'time': time.time() - start_time}
+
+    if save_to is not None:
+        return pattern.serialize(save_to, **save_args), stats
+    return pattern, stats
+
+
 if __name__ == "__main__":
     from datetime import datetime
     import time
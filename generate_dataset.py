@@ -0,0 +1,267 @@
+"""Generate a dataset of sewing patterns over a set of designs and body measurements
+
+    Designs are taken from design parameter files, or sampled from the parameter
+    ranges of a base design file. Every design is built for every body
+    by a pool of worker processes.
+
+    Progress is recorded in dataset_properties.json in the output folder:
+    re-running the same command resumes the interrupted generation
+    skipping the already processed (or rejected) datapoints.
+    The failed datapoints are re-tried.
+
+    Examples:
+        python generate_dataset.py -b assets/body_measurments/*.yaml -d assets/design_params/*.yaml -o Logs/dataset
+        python generate_dataset.py -b assets/body_measurments/f_smpl_avg.yaml --sample 1000 -o Logs/random_designs
+
+    With --render skip, only the pattern specifications are saved. 
+    The images can be created later with render_missing.py
+
+    With --shards, the datapoints are packed into a few large shard files
+    instead of a folder per datapoint (see pattern.shards)
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from glob import glob
+from pathlib import Path
+import os
+import sys
+import time
+import traceback
+import yaml
+
+# Makes core library available without extra installation steps
+sys.path.insert(0, './external/')
+sys.path.insert(1, './')
+
+# Custom
+import customconfig
+from pattern.wrappers import RenderQueue
+from pattern.shards import ShardWriter, pattern_files
+from pygarment import DesignSampler
+from assets.garment_programs.meta_garment import MetaGarment
+from assets.body_measurments.body_params import BodyParameters
+
+
+def get_command_args():
+    parser = argparse.ArgumentParser(
+        description='Generate sewing patterns over a grid of designs and body measurements')
+    parser.add_argument('-b', '--bodies', nargs='+', required=True,
+                        help='Body measurements files (glob patterns are allowed)')
+    parser.add_argument('-d', '--designs', nargs='+', default=['./assets/design_params/default.yaml'],
+                        help='Design parameters files (glob patterns are allowed). '
+                             'With --sample, the first file defines the parameter ranges to sample from')
+    parser.add_argument('-s', '--sample', type=int, default=0,
+                        help='Number of random designs to sample from the parameter ranges instead of using design files as is')
+    parser.add_argument('--strategy', default='uniform', choices=DesignSampler.strategies,
+                        help='Design sampling strategy')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for design sampling')
+    parser.add_argument('-o', '--out', default='./Logs/dataset', help='Output folder')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--with_3d', nargs='?', const='matplotlib', default=False, choices=['matplotlib', 'fast'],
+                        help='Save 3D visualization of the patterns: matplotlib 3D plot (default) '
+                             'or fast orthographic preview of the panel outlines')
+    parser.add_argument('--spec_format', default='json', choices=['json', 'npz', 'both'],
+                        help='Format of the pattern specifications: JSON, binary NPZ or both')
+    parser.add_argument('--render', default='sync', choices=['sync', 'deferred', 'skip'],
+                        help='Create pattern images together with the patterns (sync), '
+                             'by a separate pool of workers (deferred) or not at all (skip)')
+    parser.add_argument('--shards', action='store_true',
+                        help='Pack the datapoints into shard files with a manifest instead of a folder per datapoint')
+    parser.add_argument('--shard_size', type=int, default=256, help='Max size of a shard file in MB')
+    parser.add_argument('--render_workers', type=int, default=None, 
+                        help='Number of rendering processes for --render deferred (number of CPUs by default)')
+    parser.add_argument('--reject_intersecting', action='store_true',
+                        help='Skip the garments with self-intersecting panels (checked before saving)')
+
+    args = parser.parse_args()
+    if args.shards and (args.render == 'deferred' or args.with_3d):
+        parser.error('--shards supports only --render sync or skip without --with_3d')
+
+    return args
+
+
+def _expand(patterns):
+    files = []
+    for p in patterns:
+        files += sorted(glob(p)) or [p]
+    return files
+
+
+def design_tasks(args):
+    """List of (design name, design parameters) to generate"""
+    files = _expand(args.designs)
+    if args.sample:
+        sampler = DesignSampler(files[0])
+        samples = sampler.sample_batch(args.sample, args.strategy, args.seed)
+        return [(f'rand_{i:06d}', sampler.to_design(s)) for i, s in enumerate(samples)]
+
+    designs = []
+    for f in files:
+        with open(f, 'r') as f_yaml:
+            designs.append((Path(f).stem, yaml.safe_load(f_yaml)['design']))
+    return designs
+
+
+# ----- Worker -----
+_bodies = {}   # Body parameters loaded in the current process
+
+def generate(
+        name, body_file, design, out_path, 
+        with_3d=False, render=True, spec_format='json', shards=False, reject_intersecting=False):
+    """Build and save a single garment
+
+        Returns the name of the datapoint, the build & save time, 
+        the specification file (None if the pattern is empty),
+        the files of the datapoint to write to shards (None if not using shards) and
+        the self-intersections of the panels if the garment was rejected (None otherwise)
+    """
+    if body_file not in _bodies:
+        _bodies[body_file] = BodyParameters(body_file)
+    body = _bodies[body_file]
+
+    start_time = time.time()
+    garment = MetaGarment(name, body, design)
+    if reject_intersecting:
+        intersections = garment.self_intersections()
+        if intersections:
+            return name, time.time() - start_time, 0, None, None, intersections
+    pattern = garment()
+    build_time = time.time() - start_time
+
+    if shards:
+        # Shards are written by the main process
+        files = pattern_files(
+            pattern, 
+            extra_files={
+                'body_measurements.yaml': yaml.dump({'body': body.params}, default_flow_style=False),
+                'design_params.yaml': yaml.dump({'design': design}, default_flow_style=False, sort_keys=False)
+            },
+            spec_format=spec_format, with_images=render, with_text=False, view_ids=False)
+        return name, build_time, time.time() - start_time - build_time, None, files, None
+
+    folder = Path(out_path) / name
+    folder.mkdir(parents=True, exist_ok=True)
+    pattern.serialize(
+        folder, to_subfolder=False,
+        with_3d=with_3d, with_text=False, view_ids=False,
+        empty_ok=True, render=render, spec_format=spec_format)
+    body.save(folder)
+    with open(folder / 'design_params.yaml', 'w') as f:
+        yaml.dump({'design': design}, f, default_flow_style=False, sort_keys=False)
+
+    _, spec_file = pattern._serialization_paths(folder, False, spec_format=spec_format)
+    spec_file = spec_file if pattern.panel_order() else None
+    return name, build_time, time.time() - start_time - build_time, spec_file, None, None
+
+
+# ----- Bookkeeping -----
+def load_props(out_path, args):
+    props_file = out_path / 'dataset_properties.json'
+    if props_file.exists():
+        props = customconfig.Properties(props_file)
+        print(f'Resuming generation of {props["name"]} from {props_file}')
+    else:
+        props = customconfig.Properties()
+        props.set_basic(
+            name=out_path.name,
+            creation_time=datetime.now().strftime("%y%m%d-%H-%M-%S"))
+        props.add_sys_info()
+    props.set_section_config(
+        'generator',
+        bodies=_expand(args.bodies),
+        designs=_expand(args.designs),
+        sample=args.sample,
+        strategy=args.strategy,
+        seed=args.seed,
+        with_3d=args.with_3d,
+        render=args.render,
+        spec_format=args.spec_format,
+        shards=args.shards,
+        reject_intersecting=args.reject_intersecting)
+
+    stats = props['generator']['stats']
+    for key in ['processed', 'fails', 'rejected', 'build_time', 'save_time']:
+        stats.setdefault(key, {} if 'time' in key or key == 'rejected' else [])
+
+    return props, props_file
+
+
+if __name__ == '__main__':
+    args = get_command_args()
+
+    out_path = Path(args.out)
+    out_path.mkdir(parents=True, exist_ok=True)
+    props, props_file = load_props(out_path, args)
+    stats = props['generator']['stats']
+    writer = ShardWriter(out_path, args.shard_size * 2**20) if args.shards else None
+    if writer is not None:
+        # Written after the last progress save
+        stats['processed'] += [n for n in writer.index if n not in stats['processed']]
+    done = set(stats['processed']) | set(stats['rejected'])   # NOTE: fails are re-tried
+
+    # Datapoints
+    tasks = []
+    designs = design_tasks(args)   # Same designs for all the bodies
+    for body_file in _expand(args.bodies):
+        for design_name, design in designs:
+            name = f'{Path(body_file).stem}__{design_name}'
+            if name not in done:
+                tasks.append((name, body_file, design))
+    print(f'Generating {len(tasks)} garments ({len(done)} processed before) with {args.workers} workers')
+
+    start_time = time.time()
+    prev_total_time = stats.get('total_time', 0)   # of the previous runs
+    render_queue = RenderQueue(args.render_workers) if args.render == 'deferred' else None
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(
+                generate, name, body_file, design, out_path, 
+                args.with_3d, args.render == 'sync', args.spec_format, args.shards,
+                args.reject_intersecting): name
+            for name, body_file, design in tasks}
+
+        for i, future in enumerate(as_completed(futures)):
+            name = futures[future]
+            try:
+                _, build_time, save_time, spec_file, files, intersections = future.result()
+                if name in stats['fails']:  # Failed on one of the previous runs
+                    stats['fails'].remove(name)
+                if intersections:
+                    print(f'Generator::Warning::{name} rejected: self-intersecting panels {intersections}')
+                    stats['rejected'][name] = intersections
+                else:
+                    if writer is not None:
+                        writer.add(name, files)
+                    if render_queue is not None and spec_file is not None:
+                        render_queue.submit(spec_file, with_3d=args.with_3d, with_text=False, view_ids=False)
+                    stats['processed'].append(name)
+                    stats['build_time'][name] = build_time
+                    stats['save_time'][name] = save_time
+            except Exception:
+                print(f'Generator::Error::{name} failed')
+                traceback.print_exc()
+                if name not in stats['fails']:
+                    stats['fails'].append(name)
+
+            # Save progress once in a while
+            if (i + 1) % 100 == 0 or (i + 1) == len(tasks):
+                props.summarize_stats('build_time', log_sum=True, log_avg=True, as_time=True)
+                props.set_section_stats('generator', total_time=prev_total_time + time.time() - start_time)
+                props.serialize(props_file)
+                print(f'{i + 1}/{len(tasks)} garments processed')
+
+    if render_queue is not None:
+        print('Waiting for the rendering to finish...')
+        render_fails = render_queue.shutdown()
+        if render_fails:
+            print(f'{len(render_fails)} patterns were not rendered. Use render_missing.py to re-try')
+
+    if writer is not None:
+        writer.close()
+
+    props.set_section_stats('generator', total_time=prev_total_time + time.time() - start_time)
+    props.serialize(props_file)
+    print(f'Done! {len(stats["processed"])} garments in {out_path}, '
+          f'{len(stats["fails"])} failed, {len(stats["rejected"])} rejected')
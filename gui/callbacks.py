@@ -7,7 +7,7 @@ from copy import copy, deepcopy
 from pathlib import Path
 from datetime import datetime
 import yaml
-import shutil 
+import base64
 import numpy as np
 
 import os
@@ -16,6 +16,7 @@ import PySimpleGUI as sg
 
 
 # Custom 
+import pygarment as pyg
 from assets.garment_programs.meta_garment import MetaGarment
 from assets.body_measurments.body_params import BodyParameters
 
@@ -46,12 +47,11 @@ icon_image_b64 = b'iVBORw0KGgoAAAANSUhEUgAAAQAAAAEACAYAAABccqhmAAAACXBIWXMAAAsSA
 class GUIPattern():
     def __init__(self) -> None:
         self.save_path = Path.cwd() / 'Logs' 
-        self.png_path = None
-        self.tmp_path = Path.cwd() / 'tmp'
+        self.svg_data = None   # In-memory SVG & PNG representations of the current garment
+        self.png_data = None
         
         # create paths
         self.save_path.mkdir(parents=True, exist_ok=True)
-        self.tmp_path.mkdir(parents=True, exist_ok=True)
 
         self.ui_id = None   # ID of current object in the interface
         self.body_bottom = None   # Location of body center in the current png representation of a garment
@@ -59,6 +59,9 @@ class GUIPattern():
         self.body_file = None
         self.design_file = None
         self.design_params = {}
+
+        # Components of the previous builds for re-use on parameter updates
+        self.build_cache = pyg.BuildCache()
         self.new_body_file(
             Path.cwd() / 'assets/body_measurments/f_smpl_avg.yaml'
         )
@@ -131,7 +134,9 @@ class GUIPattern():
     def reload_garment(self):
         """Reload sewing pattern with current body and design parameters"""
         if self.isReady():
-            self.sew_pattern = MetaGarment('Configured_design', self.body_params, self.design_params)
+            # NOTE: only the components affected by parameter changes are re-built
+            self.sew_pattern = self.build_cache.build(
+                MetaGarment, 'Configured_design', self.body_params, self.design_params)
             self._view_serialize()
 
     def sync_left(self):
@@ -141,40 +146,20 @@ class GUIPattern():
                 self.design_params['left'][k] = deepcopy(self.design_params[k])
 
     def _view_serialize(self):
-        """Save a sewing pattern svg/png representation to tmp folder be used for display"""
+        """Render a sewing pattern svg/png representation in memory to be used for display"""
 
-        # Clear up the folder from previous version -- it's not needed any more
-        self.clear_tmp()
         pattern = self.sew_pattern()
 
         if not len(pattern.panel_order()): 
             # Empty pattern
-            self.png_path = ''
+            self.svg_data, self.png_data = None, None
             return
 
-        # Save as json file
-        folder = pattern.serialize(
-            self.tmp_path, 
-            tag='_' + datetime.now().strftime("%y%m%d-%H-%M-%S"), 
-            to_subfolder=True, 
-            with_3d=False, with_text=False, view_ids=False)
+        self.svg_data, self.png_data = pattern.render(with_text=False, view_ids=False)
         
         self.body_bottom = np.asarray(pattern.body_bottom_shift)
         self.png_size = pattern.png_size
 
-        # get PNG file!
-        root, _, files = next(os.walk(folder))
-        for filename in files:
-            if 'pattern.png' in filename and '3d' not in filename:
-                self.png_path = os.path.join(root, filename)
-                break
-
-    def clear_tmp(self, root=False):
-        """Clear tmp folder"""
-        shutil.rmtree(self.tmp_path)
-        if not root:
-            self.tmp_path.mkdir(parents=True, exist_ok=True)
-
     # Current state
     def save(self):
         """Save current garment design to self.save_path """
@@ -245,7 +230,6 @@ class GUIState():
 
     def __del__(self):
         """Clenup"""
-        self.pattern_state.clear_tmp(root=True)
         self.window.close()
 
     # Pretty stuff
@@ -560,7 +544,7 @@ class GUIState():
             self.window['CANVAS'].delete_figure(self.pattern_state.ui_id)
             self.pattern_state.ui_id = None
 
-        if not self.pattern_state.png_path:  # Empty pattern
+        if not self.pattern_state.png_data:  # Empty pattern
             return
 
         # Image body center with the body center of a body silhouette
@@ -590,7 +574,7 @@ class GUIState():
 
         # Display the pattern
         self.pattern_state.ui_id = self.window['CANVAS'].draw_image(
-            filename=self.pattern_state.png_path, location=location.tolist())
+            data=base64.b64encode(self.pattern_state.png_data), location=location.tolist())
 
     def upd_fields_body(self):
         """Update current values of the fields 
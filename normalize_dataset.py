@@ -0,0 +1,71 @@
+"""Upgrade the pattern specifications of a dataset to the current normalized form
+
+    Normalized specifications (stamped with the normalization version) are used as is on load,
+    without re-normalization. Patterns saved by older versions of the library (or templates) are
+    normalized on every load -- this script normalizes them once and saves the result in place
+
+    Example:
+        python normalize_dataset.py Logs/dataset -w 8
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+import os
+import sys
+import time
+
+# Makes core library available without extra installation steps
+sys.path.insert(0, './external/')
+sys.path.insert(1, './')
+
+from pattern import core
+
+
+def get_command_args():
+    parser = argparse.ArgumentParser(
+        description='Normalize the pattern specifications of a dataset in place')
+    parser.add_argument('path', help='Folder to search for the pattern specifications (recursively)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+
+    return parser.parse_args()
+
+
+def spec_files(path):
+    for root, _, files in os.walk(path):
+        for filename in sorted(files):
+            if filename.endswith('specification.json') or filename.endswith('specification.npz'):
+                yield os.path.join(root, filename)
+
+
+def normalize(spec_file):
+    """Normalize the specification file in place
+
+        Returns True if the file was updated
+    """
+    spec = core.read_spec(spec_file)
+    original = deepcopy(spec)
+    pattern = core.ParametrizedPattern.from_spec(spec, name=core.BasicPattern.name_from_path(spec_file))
+    if pattern.spec == original:
+        return False
+
+    core.write_spec(pattern.spec, spec_file)
+    return True
+
+
+if __name__ == '__main__':
+    args = get_command_args()
+
+    start_time = time.time()
+    files = list(spec_files(args.path))
+    updated, fails = 0, 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(normalize, f) for f in files]
+        for spec_file, future in zip(files, futures):
+            try:
+                updated += future.result()
+            except Exception as e:
+                print(f'Normalize::ERROR::{spec_file}: {e}')
+                fails += 1
+
+    print(f'Normalized {updated} of {len(files)} specifications in {time.time() - start_time:.2f}s, {fails} failed')
@@ -8,6 +8,8 @@ from .edge import *
 from .connector import Stitches
 from .interface import Interface
 from .edge_factory import EdgeSeqFactory as esf
+from .build_cache import BuildCache
+from .profiler import BuildProfiler
 
 # Operations
 import pygarment.operators as ops
@@ -16,4 +18,5 @@ import pygarment.flags as flags
 
 # Parameter support
 from .params import *
+from .sampler import DesignSampler
 
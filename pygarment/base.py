@@ -1,11 +1,15 @@
 
 from typing import Any
 from .connector import Stitches
+from .build_cache import CachedBuildMeta
+from . import profiler
 
-class BaseComponent():
+class BaseComponent(metaclass=CachedBuildMeta):
     """Basic interface for garment-related components
     
         NOTE: modifier methods return self object to allow chaining of the operations
+        NOTE: construction of components is routed through the active BuildCache (if any)
+        NOTE: construction & assembly are recorded by the active BuildProfiler (if any)
     """
 
     def __init__(self, name) -> None:
@@ -27,6 +31,19 @@ class BaseComponent():
         """Bounding box"""
         return 0, 0, 0, 0, 0, 0
 
+    # Checks
+    def self_intersections(self, curve_segments=10):
+        """Intersecting edges of the panels of the component
+
+            Returns dictionary {panel name: [(edge id, edge id), ...]} of the self-intersecting panels
+            (empty if the component is valid)
+        """
+        return {}
+
+    def is_self_intersecting(self, curve_segments=10):
+        """Returns True if any of the panels of the component are self-intersecting"""
+        return bool(self.self_intersections(curve_segments))
+
     # Operations
     def translate_by(self, delta_translation):
         return self
@@ -45,4 +62,6 @@ class BaseComponent():
         return {}
 
     def __call__(self, *args: Any, **kwds: Any) -> Any:
+        if profiler.is_active():
+            return profiler.call(f'{self.__class__.__name__}:{self.name}.assembly', self.assembly, *args, **kwds)
         return self.assembly(*args,**kwds)
\ No newline at end of file
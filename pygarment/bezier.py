@@ -0,0 +1,220 @@
+"""NumPy evaluation routines for Quadratic and Cubic Bezier curves
+
+    Curves are given by their control points as arrays of shape (..., n + 1, 2),
+    where n is the degree of the curve. Any leading dimensions are treated
+    as a batch of curves of the same degree, s.t. many curves can be evaluated at once.
+"""
+
+import numpy as np
+from scipy.special import comb
+
+# Gauss-Legendre quadrature nodes & weights mapped to [0, 1]
+_gl_nodes, _gl_weights = np.polynomial.legendre.leggauss(16)
+_gl_nodes = (_gl_nodes + 1) / 2
+_gl_weights = _gl_weights / 2
+
+# Bernstein bases evaluated at the composite quadrature nodes, 
+# keyed by (degree, number of segments)
+_quadrature_bases = {}
+
+
+def _bernstein(n, t):
+    """Bernstein basis of degree n evaluated at parameter values t -- (T, n + 1) array"""
+    t = np.asarray(t, dtype=float)[:, None]
+    k = np.arange(n + 1)
+    return comb(n, k) * t**k * (1 - t)**(n - k)
+
+
+def _hodograph(cps):
+    """Control points of the derivative curve"""
+    n = cps.shape[-2] - 1
+    return n * (cps[..., 1:, :] - cps[..., :-1, :])
+
+
+def point(cps, t):
+    """Points on the curve(s) at parameter values t
+
+        * cps -- (..., n + 1, 2) control points
+        * t -- scalar or 1D array of parameter values
+
+        Returns (..., 2) array for scalar t or (..., T, 2) otherwise
+    """
+    cps = np.asarray(cps, dtype=float)
+    scalar = np.ndim(t) == 0
+    basis = _bernstein(cps.shape[-2] - 1, np.atleast_1d(t))
+    points = np.matmul(basis, cps)
+
+    return points[..., 0, :] if scalar else points
+
+
+def derivative(cps, t, n=1):
+    """n-th derivative of the curve(s) w.r.t. parameter at t
+        (same output shape as in point())"""
+    cps = np.asarray(cps, dtype=float)
+    for _ in range(n):
+        cps = _hodograph(cps)
+    return point(cps, t)
+
+
+def length(cps, tol=1e-10, max_segments=1024):
+    """Arc length of the curve(s)
+
+        Evaluated with composite Gauss-Legendre quadrature. The number of 
+        uniform parameter segments is doubled until two consecutive estimates 
+        agree within tol (relative to lengths larger then 1)
+
+        Returns scalar for a single curve or (...) array for a batch of curves
+    """
+    hodograph = _hodograph(np.asarray(cps, dtype=float))
+    batch_shape = hodograph.shape[:-2]
+    hodograph = hodograph.reshape(-1, *hodograph.shape[-2:])
+
+    segments = 4
+    lengths = _quadrature_length(hodograph, segments)
+    active = np.arange(len(lengths))   # Curves that still need refinement
+    while segments < max_segments and len(active):
+        segments *= 2
+        refined = _quadrature_length(hodograph[active], segments)
+        converged = np.abs(refined - lengths[active]) <= tol * np.maximum(np.abs(refined), 1)
+        lengths[active] = refined
+        active = active[~converged]
+
+    return lengths.reshape(batch_shape) if batch_shape else lengths[0]
+
+
+def _quadrature_length(hodograph, segments):
+    """Integrate the speed of the curve(s) given by the derivative control points"""
+    key = (hodograph.shape[-2] - 1, segments)
+    if key not in _quadrature_bases:
+        t = ((np.arange(segments)[:, None] + _gl_nodes) / segments).ravel()
+        weights = np.tile(_gl_weights, segments) / segments
+        _quadrature_bases[key] = _bernstein(key[0], t), weights
+    basis, weights = _quadrature_bases[key]
+
+    speed = np.linalg.norm(np.matmul(basis, hodograph), axis=-1)
+
+    return speed @ weights
+
+
+def extremizers(cps, axis=1):
+    """Parameter values in (0, 1) where the coordinate of a single curve
+        along the given axis (0 = X, 1 = Y) reaches local extrema
+
+        Returned in increasing order.
+        NOTE: does NOT include the endpoints of the curve
+    """
+    c = np.asarray(cps, dtype=float)[:, axis]
+
+    # Coefficients of the derivative polynomial: a t^2 + b t + c
+    if len(c) == 3:
+        a, b, c = 0, c[0] - 2 * c[1] + c[2], c[1] - c[0]
+    elif len(c) == 4:
+        a, b, c = -c[0] + 3 * c[1] - 3 * c[2] + c[3], 2 * (c[0] - 2 * c[1] + c[2]), c[1] - c[0]
+    else:
+        raise NotImplementedError(f'Bezier::Error::Only Quadratic and Cubic curves are supported')
+
+    if abs(a) < 1e-12:
+        roots = [-c / b] if abs(b) > 1e-12 else []
+    else:
+        disc = b**2 - 4 * a * c
+        if disc < 0:
+            roots = []
+        else:
+            # Numerically stable form of the quadratic formula
+            q = -(b + np.copysign(np.sqrt(disc), b)) / 2
+            roots = [q / a, c / q] if q != 0 else [0.]
+
+    roots = sorted(r for r in roots if 0 < r < 1)
+    # Remove duplicates (double root)
+    return [r for i, r in enumerate(roots) if i == 0 or not np.isclose(r, roots[i - 1])]
+
+
+def extreme_points(cps, axis=1):
+    """Points of a single curve in which its coordinate along the given
+        axis reaches local extrema -- (K, 2) array
+
+        NOTE: does NOT include the endpoints of the curve
+    """
+    t = extremizers(cps, axis)
+    if not t:
+        return np.empty((0, 2))
+    return point(cps, t)
+
+
+def curvature(cps, t):
+    """Unsigned curvature of the curve(s) at parameter values t
+
+        Returns scalar / (T, ) for a single curve and (..., ) / (..., T) for batches of curves.
+        NOTE: the curvature is infinite at the points with zero derivative (cusps)
+    """
+    d1 = derivative(cps, t)
+    d2 = derivative(cps, t, n=2)
+
+    cross = np.abs(d1[..., 0] * d2[..., 1] - d1[..., 1] * d2[..., 0])
+    speed = np.linalg.norm(d1, axis=-1)
+
+    return np.divide(
+        cross, speed**3,
+        out=np.full_like(cross, np.inf), where=speed > 0)
+
+
+def max_curvature(cps, points_estimates=100):
+    """Maximum of the curve(s) curvature estimated on the uniform parameter grid"""
+    t_space = np.linspace(0, 1, points_estimates)
+    return curvature(cps, t_space).max(axis=-1)
+
+
+# ----- Gradients w.r.t. control points -----
+def _hodograph_grad(grad_hodograph, n):
+    """Pull back the gradient w.r.t. hodograph control points to the 
+        gradient w.r.t. control points of the curve of degree n"""
+    pad = np.zeros((*grad_hodograph.shape[:-2], 1, grad_hodograph.shape[-1]))
+    return n * (np.concatenate([pad, grad_hodograph], axis=-2) 
+                - np.concatenate([grad_hodograph, pad], axis=-2))
+
+
+def length_gradient(cps, segments=32):
+    """Gradient of the arc length of a single curve w.r.t. its control points -- (n + 1, 2) array
+
+        Evaluated with composite Gauss-Legendre quadrature with the fixed number of segments
+    """
+    cps = np.asarray(cps, dtype=float)
+    n = cps.shape[-2] - 1
+    hodograph = _hodograph(cps)
+    _quadrature_length(hodograph, segments)  # Makes sure the basis is cached
+    basis, weights = _quadrature_bases[(n - 1, segments)]
+
+    d1 = basis @ hodograph
+    speed = np.linalg.norm(d1, axis=-1, keepdims=True)
+    tangents = np.divide(d1, speed, out=np.zeros_like(d1), where=speed > 0)
+
+    return _hodograph_grad(basis.T @ (weights[:, None] * tangents), n)
+
+
+def curvature_gradient(cps, t):
+    """Gradient of the unsigned curvature of a single curve at parameter 
+        value t w.r.t. its control points -- (n + 1, 2) array
+
+        NOTE: zero is returned at the points with zero derivative (cusps)
+    """
+    cps = np.asarray(cps, dtype=float)
+    n = cps.shape[-2] - 1
+    hodograph = _hodograph(cps)
+    d1 = point(hodograph, t)
+    d2 = point(_hodograph(hodograph), t)
+
+    speed = np.linalg.norm(d1)
+    if speed == 0:
+        return np.zeros_like(cps)
+    cross = d1[0] * d2[1] - d1[1] * d2[0]
+    sign = np.sign(cross)
+
+    grad_d1 = sign * np.array([d2[1], -d2[0]]) / speed**3 - 3 * abs(cross) * d1 / speed**5
+    grad_d2 = sign * np.array([-d1[1], d1[0]]) / speed**3
+
+    # Chain through the Bernstein bases and hodographs
+    grad_hodograph = _bernstein(n - 1, [t])[0][:, None] * grad_d1
+    grad_hodograph += _hodograph_grad(
+        _bernstein(n - 2, [t])[0][:, None] * grad_d2, n - 1)
+
+    return _hodograph_grad(grad_hodograph, n)
@@ -0,0 +1,346 @@
+"""Incremental re-building of garment components
+
+    Within BuildCache.build(), every component records the design & body
+    parameters it reads during its construction. The constructed components
+    are cached together with these dependencies, s.t. subsequent builds
+    re-use the components (whole sub-trees) whose dependencies did not change
+    instead of constructing them again.
+
+    NOTE: A component is cached only if all its constructor arguments other than
+    parameter sets are simple values (numbers, strings, lists of those, etc.)
+    and it does not modify the parameter sets it receives.
+    Other components are always re-built.
+"""
+
+from copy import copy, deepcopy
+from collections import OrderedDict
+import itertools
+import numpy as np
+
+from .params import BodyParametrizationBase
+from . import profiler
+
+_active_cache = None    # BuildCache of the current build
+_records = []           # Dependency records of the components under construction
+_serials = itertools.count()
+_freeze = False         # Detach the tracked parameters from their origins on copy
+
+_KEYS = '<keys>'        # Path element to mark reads of the key set
+
+
+class _NotCacheable(Exception):
+    pass
+
+
+class _Root():
+    """Parameter set tracked for reads and writes"""
+    def __init__(self, data, origin=None, prefix=()) -> None:
+        self.data = data
+        # The parameter set this one was copied from & location of the copied subtree in it
+        self.origin = origin
+        self.prefix = prefix
+        self.written = set()
+        self.serial = next(_serials)
+
+    def is_written(self, path):
+        return any(path[:len(w)] == w for w in self.written)
+
+
+class _Record():
+    """Dependencies of a component on its (tracked) parameter arguments"""
+    def __init__(self, params) -> None:
+        self.params = params   # arg id -> TrackedParams
+        self.deps = {}         # (arg id, path) -> value
+        self.cacheable = True
+        self.serial = next(_serials)
+
+    def _resolve(self, root, path):
+        """Express the parameter location w.r.t. the component arguments
+
+            Returns (arg id, path), None if the value was set during the build
+            (hence depends on other reads) or False if the location is unrelated to
+            the arguments
+        """
+        while True:
+            for key, p in self.params.items():
+                if p._root is root and path[:len(p._path)] == p._path:
+                    return key, path[len(p._path):]
+            if root.is_written(path):
+                return None
+            if root.origin is None:
+                return False
+            root, path = root.origin, root.prefix + path
+
+    def read(self, root, path, value):
+        loc = self._resolve(root, path)
+        if loc is False:
+            self.cacheable = False
+        elif loc is not None and loc not in self.deps:
+            self.deps[loc] = value
+
+    def write(self, root):
+        if root.serial < self.serial:
+            # Parameters from outside of the component are modified
+            # The effect would be lost on re-use
+            self.cacheable = False
+
+
+def _record_read(root, path, value):
+    if not _records:
+        return
+    if not isinstance(value, (bool, int, float, str, type(None))):
+        value = deepcopy(value)
+    for rec in _records:
+        rec.read(root, path, value)
+
+
+def _record_write(root, path):
+    root.written.add(path)
+    for rec in _records:
+        rec.write(root)
+
+
+class TrackedParams():
+    """Wrapper around design parameters dictionary or body parameters
+        that records the parameter reads & writes for BuildCache
+    """
+    def __init__(self, data, root=None, path=()) -> None:
+        self._data = data
+        self._root = root if root is not None else _Root(data)
+        self._path = path
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        path = self._path + (key, )
+        if isinstance(value, dict):
+            return TrackedParams(value, self._root, path)
+        _record_read(self._root, path, value)
+        return value
+
+    def __setitem__(self, key, value):
+        if isinstance(value, TrackedParams):
+            value = value._data
+        if isinstance(self._data, dict):
+            self._data[key] = value
+            _record_write(self._root, self._path + (key, ))
+        else:
+            # Body parameters re-evaluate the dependent values on update
+            before = {k: self._data[k] for k in self._data}
+            self._data[key] = value
+            for k in self._data:
+                if k not in before or k == key or before[k] != self._data[k]:
+                    _record_write(self._root, self._path + (k, ))
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        keys = list(self._data)
+        _record_read(self._root, self._path + (_KEYS, ), keys)
+        return keys
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __deepcopy__(self, memo):
+        data = deepcopy(self._data, memo)
+        if _freeze:
+            return TrackedParams(data)
+        return TrackedParams(data, _Root(data, self._root, self._path))
+
+    def __copy__(self):
+        data = copy(self._data)
+        return TrackedParams(data, _Root(data, self._root, self._path))
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ['_data', '_root', '_path']:
+            raise AttributeError(name)
+        # Reads through other attributes cannot be tracked
+        for rec in _records:
+            rec.cacheable = False
+        return getattr(self._data, name)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._data!r})'
+
+
+def _fingerprint(value):
+    """Hashable representation of a simple (non-parameter) constructor argument"""
+    if isinstance(value, TrackedParams):
+        return (TrackedParams, )
+    if isinstance(value, (bool, int, float, str, type(None))):
+        return (type(value), value)
+    if isinstance(value, np.generic):
+        return (type(value), value.item())
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return (np.ndarray, value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_fingerprint(v) for v in value))
+    raise _NotCacheable()
+
+
+def _lookup(data, path):
+    for key in path:
+        if key == _KEYS:
+            return list(data)
+        data = data[key]
+    return data
+
+
+def _same(a, b):
+    if type(a) is not type(b):
+        return False
+    try:
+        if isinstance(a, np.ndarray):
+            return np.array_equal(a, b)
+        return bool(a == b)
+    except (ValueError, TypeError):
+        return False
+
+
+class _Entry():
+    def __init__(self, component, deps) -> None:
+        self.component = component
+        self.deps = deps
+
+    def matches(self, params):
+        for (key, path), value in self.deps.items():
+            if key not in params:
+                return False
+            try:
+                current = _lookup(params[key]._data, path)
+            except (KeyError, IndexError, TypeError):
+                return False
+            if not _same(current, value):
+                return False
+        return True
+
+
+class BuildCache():
+    """Cache of the constructed components for incremental re-building of garments
+
+        Example:
+            cache = BuildCache()
+            garment = cache.build(MetaGarment, 'name', body, design)
+            ...  # update design
+            garment = cache.build(MetaGarment, 'name', body, design)  # Only affected components are re-built
+
+        * max_size -- max number of cached component configurations
+        * max_variants -- max number of cached versions of the same component configuration
+            (e.g. for different parameter values)
+    """
+    def __init__(self, max_size=512, max_variants=4) -> None:
+        self.max_size = max_size
+        self.max_variants = max_variants
+        self._entries = OrderedDict()
+
+        # Stats of the last build
+        self.hits = 0
+        self.misses = 0
+
+    def build(self, component_class, *args, **kwargs):
+        """Construct the component with the given arguments re-using the
+            cached sub-components when possible
+
+            Parameter sets (design dictionaries and body parameters) among the
+            arguments are tracked for dependencies
+        """
+        global _active_cache
+        prev_cache, _active_cache = _active_cache, self
+        self.hits, self.misses = 0, 0
+        try:
+            args = [self._track(a) for a in args]
+            kwargs = {k: self._track(a) for k, a in kwargs.items()}
+            return component_class(*args, **kwargs)
+        finally:
+            _active_cache = prev_cache
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return sum(len(v) for v in self._entries.values())
+
+    # Construction
+    def _track(self, arg):
+        if isinstance(arg, (dict, BodyParametrizationBase)):
+            return TrackedParams(arg)
+        return arg
+
+    def _construct(self, cls, args, kwargs):
+        try:
+            key = (cls,
+                   _fingerprint(args),
+                   _fingerprint(sorted(kwargs.items())))
+        except _NotCacheable:
+            return type.__call__(cls, *args, **kwargs)
+
+        params = {i: a for i, a in enumerate(args) if isinstance(a, TrackedParams)}
+        params.update({k: a for k, a in kwargs.items() if isinstance(a, TrackedParams)})
+
+        # Re-use
+        for entry in self._entries.get(key, []):
+            if entry.matches(params):
+                self.hits += 1
+                self._entries.move_to_end(key)
+                # Dependencies are passed to the components under construction
+                for (arg, path), value in entry.deps.items():
+                    _record_read(params[arg]._root, params[arg]._path + path, value)
+                return deepcopy(entry.component)
+
+        # Build
+        self.misses += 1
+        record = _Record(params)
+        _records.append(record)
+        try:
+            component = type.__call__(cls, *args, **kwargs)
+        finally:
+            _records.pop()
+
+        if record.cacheable:
+            self._store(key, _Entry(self._frozen_copy(component), record.deps))
+
+        return component
+
+    def _frozen_copy(self, component):
+        """Copy of the component that is not linked to the tracked parameters of the current build"""
+        global _freeze
+        _freeze = True
+        try:
+            return deepcopy(component)
+        finally:
+            _freeze = False
+
+    def _store(self, key, entry):
+        variants = self._entries.setdefault(key, [])
+        variants.insert(0, entry)
+        del variants[self.max_variants:]
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class CachedBuildMeta(type):
+    """Metaclass of garment components routing their construction
+        through the active BuildCache (if any) and BuildProfiler (if any)"""
+    def __call__(cls, *args, **kwargs):
+        return profiler.construct(cls, _build, args, kwargs)
+
+
+def _build(cls, args, kwargs):
+    if _active_cache is None:
+        return type.__call__(cls, *args, **kwargs)
+    return _active_cache._construct(cls, args, kwargs)
@@ -5,6 +5,7 @@ from scipy.spatial.transform import Rotation as R
 from pattern.core import BasicPattern
 from pattern.wrappers import VisPattern
 from .base import BaseComponent
+from .panel import Panel
 from .interface import Interface
 
 class Component(BaseComponent):
@@ -15,6 +16,19 @@ class Component(BaseComponent):
 
         self.subs = []  # list of generative sub-components
 
+    def __setattr__(self, name, value):
+        """Keep the registry of the subcomponents assigned as attributes up to date"""
+        children = self.__dict__.setdefault('_children', {})
+        if isinstance(value, BaseComponent):
+            children[name] = value
+        else:
+            children.pop(name, None)
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        self.__dict__.get('_children', {}).pop(name, None)
+        super().__delattr__(name)
+
     # Operations -- update object in-place
     # All return self object to allow chained operations
 
@@ -135,6 +149,15 @@ class Component(BaseComponent):
 
         return spattern   
 
+    # Checks
+    def self_intersections(self, curve_segments=10):
+        """Intersecting edges of the panels of the component (see Panel.self_intersections())"""
+        return Panel.find_intersections(self._get_panels(), curve_segments)
+
+    def is_self_intersecting(self, curve_segments=10):
+        """Returns True if any of the panels of the component are self-intersecting"""
+        return bool(Panel.find_intersections(self._get_panels(), curve_segments, first_only=True))
+
     # Utilities
     def bbox3D(self):
         """Evaluate 3D bounding box of the current component"""
@@ -148,9 +171,19 @@ class Component(BaseComponent):
         return mins.min(axis=0), maxes.max(axis=0)
 
     # Subcomponents
-    def _get_subcomponents(self):
-        """Unique set of subcomponents defined in the self.subs list or as attributes of the object"""
+    def _get_panels(self):
+        """All the panels of the component and its subcomponents"""
+        panels = []
+        for sub in self._get_subcomponents():
+            if isinstance(sub, Panel):
+                panels.append(sub)
+            elif isinstance(sub, Component):
+                panels += sub._get_panels()
+        return panels
 
-        all_attrs = [getattr(self, name) for name in dir(self) if name[:2] != '__' and name[-2:] != '__']
-        return list(set([att for att in all_attrs if isinstance(att, BaseComponent)] + self.subs))
+    def _get_subcomponents(self):
+        """Unique list of subcomponents defined as attributes of the object (in the order of assignment)
+            or in the self.subs list"""
+        children = self.__dict__.get('_children', {})
+        return list(dict.fromkeys([*children.values(), *self.subs]))
 
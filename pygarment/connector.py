@@ -6,6 +6,7 @@ import numpy as np
 from .edge_factory import EdgeSeqFactory
 from .interface import Interface
 from .generic_utils import close_enough
+from .profiler import profiled
 from . import flags
 
 verbose=flags.VERBOSE
@@ -13,6 +14,7 @@ verbose=flags.VERBOSE
 class StitchingRule():
     """High-level stitching instructions connecting two component interfaces
     """
+    @profiled
     def __init__(self, int1:Interface, int2:Interface) -> None:
         """
         NOTE: When connecting interfaces with multiple edge count on both sides, 
@@ -50,6 +52,7 @@ class StitchingRule():
         )
 
 
+    @profiled
     def match_interfaces(self):
         """ Subdivide the interface edges on both sides s.t. they are matching 
             and can be safely connected
@@ -85,11 +88,13 @@ class StitchingRule():
         # Go over the edges keeping track of their fractions
         add_id, in_id = 0, 0
         covered_init, covered_added = 0, 0
-        total_len = inter.projecting_edges().length()
+        # NOTE: projected edges only change when the interface is subdivided
+        projected = inter.projecting_edges()
+        total_len = projected.length()
 
         while in_id < len(inter.edges) and add_id < len(to_add):
             # projected edges since they represent the stitch sizes
-            next_init = covered_init + inter.projecting_edges()[in_id].length() / total_len
+            next_init = covered_init + projected[in_id].length() / total_len
             next_added = covered_added + to_add[add_id]
             if close_enough(next_init, next_added, tol):
                 # the vertex exists, skip
@@ -103,7 +108,7 @@ class StitchingRule():
             else:
                 # add a vertex to the edge at the new location
                 # Eval on projected edge
-                in_frac = inter.projecting_edges()[in_id].length() / total_len
+                in_frac = projected[in_id].length() / total_len
                 new_v_loc = in_frac - (next_init - next_added)
                 split_frac = new_v_loc / in_frac
                 base_edge, base_panel = inter.edges[in_id], inter.panel[in_id]
@@ -126,10 +131,11 @@ class StitchingRule():
                     
                 # Update interface accordingly
                 inter.substitute(base_edge, subdiv, [inter.panel[in_id] for _ in range(len(subdiv))])
+                projected = inter.projecting_edges()
 
                 # next step
                 # By the size of new edge
-                covered_init += inter.projecting_edges()[in_id].length() / total_len 
+                covered_init += projected[in_id].length() / total_len 
                 covered_added = next_added
                 in_id += 1
                 add_id += 1
@@ -1,4 +1,4 @@
-from copy import deepcopy, copy
+from copy import copy
 import numpy as np
 from numpy.linalg import norm
 import svgpathtools as svgpath  # https://github.com/mathandy/svgpathtools
@@ -6,6 +6,7 @@ import svgpathtools as svgpath  # https://github.com/mathandy/svgpathtools
 # Custom
 from .generic_utils import vector_angle, R2D, close_enough, c_to_list, list_to_c
 from .flags import VERBOSE
+from . import bezier
 
 class Edge():
     """Edge -- an individual segement of a panel border connecting two panel vertices, 
@@ -29,13 +30,28 @@ class Edge():
         # Filled out at the panel assembly time
         self.geometric_id = 0
 
+        # Length evaluated for the last seen geometry of the edge
+        self._length_cache = None
+
     # Info
     def length(self):
         """Return current length of an edge.
-            Since vertices may change their locations externally, the length is dynamically evaluated
+            Since vertices may change their locations externally, the cached length 
+            is re-evaluated every time the edge geometry differs from the cached one
         """
+        key = self._geometry_key()
+        if self._length_cache is None or self._length_cache[0] != key:
+            self._length_cache = (key, self._eval_length())
+        return self._length_cache[1]
+
+    def _eval_length(self):
+        """Evaluate the length of the current edge geometry"""
         return self._straight_len()
 
+    def _geometry_key(self):
+        """Snapshot of all the values defining the edge shape"""
+        return (*self.start, *self.end)
+
     def _straight_len(self):
         """Length of the edge ignoring the curvature"""
         return norm(np.asarray(self.end) - np.asarray(self.start))
@@ -133,6 +149,19 @@ class Edge():
         
         return np.asarray(converted)
 
+    def _clone(self, vert_copies):
+        """Copy of the edge with vertices taken from (and registered in) vert_copies.
+            vert_copies maps id() of the original vertices to their copies, 
+            s.t. vertices shared by the original edges are shared by the clones
+        """
+        new_edge = copy(self)
+        for attr in ['start', 'end']:
+            v = getattr(self, attr)
+            if id(v) not in vert_copies:
+                vert_copies[id(v)] = copy(v)
+            setattr(new_edge, attr, vert_copies[id(v)])
+        return new_edge
+
     # Actions
     def reverse(self):
         """Flip the direction of the edge"""
@@ -264,12 +293,13 @@ class CircleEdge(Edge):
         
         self.control_y = cy
 
-    def length(self):
-        """Return current length of an edge.
-            Since vertices may change their locations externally, the length is dynamically evaluated
-        """
+    def _eval_length(self):
+        """Arc length of the circle edge"""
         return self._rel_radius() * self._straight_len() * self._arc_angle()
 
+    def _geometry_key(self):
+        return (*self.start, *self.end, self.control_y)
+
     def __str__(self) -> str:
 
         points = [self.start, [0.5, self.control_y]]
@@ -534,11 +564,12 @@ class CurveEdge(Edge):
         if not relative:
             self.control_points = [self._abs_to_rel_2d(c).tolist() for c in self.control_points]
 
-    def length(self):
+    def _eval_length(self):
         """Length of Bezier curve edge"""
-        curve = self.as_curve()
-        
-        return curve.length()
+        return bezier.length(self.control_nodes())
+
+    def _geometry_key(self):
+        return (*self.start, *self.end, *(c for cp in self.control_points for c in cp))
 
     def __str__(self) -> str:
 
@@ -586,6 +617,11 @@ class CurveEdge(Edge):
 
         return subedges
 
+    def _clone(self, vert_copies):
+        new_edge = super()._clone(vert_copies)
+        new_edge.control_points = [copy(c) for c in self.control_points]
+        return new_edge
+
     # Actions
     def reverse(self):
         """Flip the direction of the edge, accounting for curvatures"""
@@ -616,17 +652,22 @@ class CurveEdge(Edge):
             Converting on the fly as exact vertex location might have been updated since
             the creation of the edge
         """
-        # Get the nodes correcly
+        nodes = self.control_nodes(absolute)
+        params = nodes[:, 0] + 1j*nodes[:, 1]
+
+        return svgpath.QuadraticBezier(*params) if len(nodes) < 4 else svgpath.CubicBezier(*params)
+
+    def control_nodes(self, absolute=True):
+        """All the Bezier control points of the edge (including endpoints) as (n + 1, 2) array
+
+            * absolute -- return the nodes in the panel 2D coordinates (True) or
+                relative to the edge (False)
+        """
         if absolute:
             cp = [self._rel_to_abs_2d(c) for c in self.control_points]
-            nodes = np.vstack((self.start, cp, self.end))
-        else:
-            cp = self.control_points
-            nodes = np.vstack(([0, 0], cp, [1, 0]))
+            return np.vstack((self.start, *cp, self.end))
         
-        params = nodes[:, 0] + 1j*nodes[:, 1]
-
-        return svgpath.QuadraticBezier(*params) if len(cp) < 2 else svgpath.CubicBezier(*params)
+        return np.vstack(([0, 0], *self.control_points, [1, 0]))
 
     def linearize(self):
         """Return a linear approximation of an edge using the same vertex objects
@@ -650,19 +691,14 @@ class CurveEdge(Edge):
             NOTE: this does NOT include the border vertices of an edge
         """
 
-        # Variation of https://github.com/mathandy/svgpathtools/blob/5c73056420386753890712170da602493aad1860/svgpathtools/bezier.py#L197
-        curve = self.as_curve(absolute=False)   # relative coords to find real extremizers
-        poly = svgpath.bezier2polynomial(curve, return_poly1d=True)
-        y = svgpath.imag(poly)
-        dy = y.deriv()
-        y_extremizers = svgpath.polyroots(dy, realroots=True,
-                                          condition=lambda r: 0 < r < 1)
+        # relative coords to find real extremizers
+        y_extremizers = bezier.extremizers(self.control_nodes(absolute=False), axis=1)
 
-        extreme_points = np.array(
-            [self._rel_to_abs_2d(c_to_list(curve.point(t))) for t in y_extremizers]
-        )
+        if not y_extremizers:
+            return np.array([])
 
-        return extreme_points
+        # NOTE: parametrization is the same in absolute coordinates
+        return bezier.point(self.control_nodes(), y_extremizers)
 
     @staticmethod
     def from_svg_curve(seg):
@@ -757,9 +793,10 @@ class EdgeSequence():
         """Fractions of the lengths of each edge in sequence w.r.t. 
             the whole sequence
         """
-        total_len = sum([e.length() for e in self.edges])
+        lengths = self.lengths()
+        total_len = sum(lengths)
 
-        return [e.length() / total_len for e in self.edges]
+        return [l / total_len for l in lengths]
 
     def lengths(self) -> list:
         """Lengths of individual edges in the sequence"""
@@ -776,6 +813,31 @@ class EdgeSequence():
             verts.pop(-1)
         return verts
 
+    def as_arrays(self):
+        """Compact representation of the sequence geometry: 
+            * (N, 2) float array of unique vertex coordinates
+            * (E, 2) int array of edge endpoints given as indices into the vertex array
+
+            NOTE: vertices are identified by reference, hence chained edges
+            share the vertex index
+        """
+        verts = self._unique_verts()
+        index = {id(v): i for i, v in enumerate(verts)}
+        endpoints = np.array(
+            [[index[id(e.start)], index[id(e.end)]] for e in self.edges],
+            dtype=int).reshape(-1, 2)
+        return np.array(verts, dtype=float), endpoints
+
+    def _unique_verts(self):
+        """Unique vertex objects (by reference) in the order of appearance"""
+        return list({id(v): v for e in self.edges for v in (e.start, e.end)}.values())
+
+    @staticmethod
+    def _set_verts(verts, coords):
+        """Update vertex objects in-place with the new coordinates"""
+        for v, c in zip(verts, coords.tolist()):
+            v[:] = c
+
     def shortcut(self):
         """Opening of an edge sequence as a vector
         
@@ -836,7 +898,7 @@ class EdgeSequence():
 
     # EdgeSequence-specific
     def translate_by(self, shift):
-        """Translate the edge seq vertices s.t. the first vertex is at new_origin
+        """Translate the edge seq vertices by a given shift vector
         """
         for v in self.verts():
             v[0] += shift[0]
@@ -865,17 +927,13 @@ class EdgeSequence():
         Parameters: 
             angle -- desired rotation angle in radians (!)
         """
-        curr_start = copy(self[0].start)
-        
-        # set the start point to zero
-        self.snap_to([0, 0])
-        rot = R2D(angle)
+        verts = self._unique_verts()
+        coords = np.asarray(verts, dtype=float)
+        curr_start = np.asarray(self[0].start, dtype=float)
 
-        for v in self.verts():
-            v[:] = np.matmul(rot, v)
-        
-        # recover the original location
-        self.snap_to(curr_start)
+        # rotate around the start point
+        coords = np.matmul(coords - curr_start, R2D(angle).T) + curr_start
+        self._set_verts(verts, coords)
 
         return self
 
@@ -897,20 +955,14 @@ class EdgeSequence():
         target_line = target_line / norm(target_line)
 
         # gather vertices
-        verts_coords = self.verts()
-        nverts_coords = np.array(verts_coords)
+        verts = self._unique_verts()
+        coords = np.asarray(verts, dtype=float)
         
         # adjust their position based on projection to the target line
-        verts_projection = np.empty(nverts_coords.shape)
-        fixed = nverts_coords[0]
-        for i in range(nverts_coords.shape[0]):
-            verts_projection[i] = (nverts_coords[i] - fixed).dot(target_line) * target_line
+        fixed = coords[0]
+        verts_projection = np.outer((coords - fixed).dot(target_line), target_line)
 
-        new_verts = verts_coords - (1 - factor) * verts_projection
-
-        # Update vertex objects
-        for i in range(len(verts_coords)):
-            verts_coords[i][:] = new_verts[i]
+        self._set_verts(verts, coords - (1 - factor) * verts_projection)
 
         return self
 
@@ -927,8 +979,9 @@ class EdgeSequence():
             ])
         
         # translate -> reflect -> translate back
-        for v in self.verts():
-            v[:] = np.matmul(Ref, np.asarray(v) - v0) + v0
+        verts = self._unique_verts()
+        coords = np.asarray(verts, dtype=float)
+        self._set_verts(verts, np.matmul(coords - v0, Ref.T) + v0)
 
         # Reflect edge features (curvatures, etc.)
         for e in self.edges:
@@ -939,18 +992,11 @@ class EdgeSequence():
     # ANCHOR New sequences & versions
     def copy(self):
         """Create a copy of a current edge sequence preserving the chaining property of edge sequences"""
-        new_seq = deepcopy(self)
-
-        # deepcopy recreates the vertex objects on both sides of the edges
-        # in chaned edges those vertex objects are supposed to be shared
-        # by neighbor edges
-
-        for i in range(1, len(new_seq)):
-            if self[i].start is self[i-1].end:
-                new_seq[i].start = new_seq[i-1].end
-            
-        if self.isLoop():
-            new_seq[-1].end = new_seq[0].start
+        # NOTE: vertex objects shared by the neighbor edges 
+        # are shared by their copies as well
+        vert_copies = {}
+        new_seq = EdgeSequence()
+        new_seq.edges = [e._clone(vert_copies) for e in self.edges]
 
         return new_seq
 
@@ -6,12 +6,21 @@ from scipy.optimize import minimize
 
 # Custom
 from .edge import EdgeSequence, Edge, CurveEdge
-from .generic_utils import close_enough, c_to_list, list_to_c
+from .generic_utils import close_enough, c_to_list, list_to_c, FitCache
 from . import flags
+from . import bezier
 
 class EdgeSeqFactory:
     """Create EdgeSequence objects for some common edge seqeunce patterns
+
+        NOTE: The results of curve fitting are cached by the relative target point
+            (per method). Set .tol and .max_size of EdgeSeqFactory.fit_cache[<method name>]
+            to configure the cache, or call .clear() on it to reset it
     """
+    fit_cache = {
+        'curve_from_extreme': FitCache(),
+        'curve_3_points': FitCache()
+    }
 
     @staticmethod
     def from_verts(*verts, loop=False):
@@ -101,18 +110,24 @@ class EdgeSeqFactory:
         """
         rel_target = _abs_to_rel_2d(start, end, target)
 
-        out = minimize(
-            _fit_y_extremum, 
-            rel_target[1],    
-            args=(rel_target)
-        )
+        cache = EdgeSeqFactory.fit_cache['curve_from_extreme']
+        cp_y = cache.get(rel_target)
+        if cp_y is None:
+            out = minimize(
+                _fit_y_extremum, 
+                rel_target[1],    
+                args=(rel_target)
+            )
 
-        if not out.success:
-            print('Curve From Extreme::WARNING::Optimization not successful')
-            if flags.VERBOSE:
-                print(out)
+            if not out.success:
+                print('Curve From Extreme::WARNING::Optimization not successful')
+                if flags.VERBOSE:
+                    print(out)
 
-        cp = [rel_target[0], out.x.item()]
+            cp_y = out.x.item()
+            cache.put(rel_target, cp_y)
+
+        cp = [rel_target[0], cp_y]
 
         return CurveEdge(start, end, control_points=[cp], relative=True)
     
@@ -129,20 +144,25 @@ class EdgeSeqFactory:
                 "is outside of the base edge, which is not yet supported"
             )
 
-        # Initialization with a target point as control point
-        # Ensures very smooth, minimal solution
-        out = minimize(
-            _fit_pass_point, 
-            rel_target,    
-            args=(rel_target)
-        )
+        cache = EdgeSeqFactory.fit_cache['curve_3_points']
+        cp = cache.get(rel_target)
+        if cp is None:
+            # Initialization with a target point as control point
+            # Ensures very smooth, minimal solution
+            out = minimize(
+                _fit_pass_point, 
+                rel_target,    
+                args=(rel_target)
+            )
 
-        if not out.success:
-            print('Curve From Extreme::WARNING::Optimization not successful')
-            if flags.VERBOSE:
-                print(out)
+            if not out.success:
+                print('Curve From Extreme::WARNING::Optimization not successful')
+                if flags.VERBOSE:
+                    print(out)
 
-        cp = out.x.tolist()
+            cp = out.x.tolist()
+            cache.put(rel_target, cp)
+        cp = list(cp)  # Cached values are shared
 
         return CurveEdge(start, end, control_points=[cp], relative=True)
 
@@ -174,30 +194,21 @@ def _abs_to_rel_2d(start, end, point):
     
     return np.asarray(converted)
 
-def _extreme_points(curve, on_x=False, on_y=True):
-    """Return extreme points of the input curve
+def _extreme_points(cps, on_x=False, on_y=True):
+    """Return extreme points of the Bezier curve given by control points (including endpoints)
         NOTE: this does NOT include the border vertices of an edge
     """
-    # Variation of https://github.com/mathandy/svgpathtools/blob/5c73056420386753890712170da602493aad1860/svgpathtools/bezier.py#L197
-    poly = svgpath.bezier2polynomial(curve, return_poly1d=True)
-    
     x_extremizers, y_extremizers = [], []
     if on_y:
-        y = svgpath.imag(poly)
-        dy = y.deriv()
-        
-        y_extremizers = svgpath.polyroots(dy, realroots=True,
-                                            condition=lambda r: 0 < r < 1)
+        y_extremizers = bezier.extremizers(cps, axis=1)
     if on_x:
-        x = svgpath.real(poly)
-        dx = x.deriv()
-        x_extremizers = svgpath.polyroots(dx, realroots=True,
-                                    condition=lambda r: 0 < r < 1)
+        x_extremizers = bezier.extremizers(cps, axis=0)
     all_extremizers = x_extremizers + y_extremizers
 
-    extreme_points = np.array([c_to_list(curve.point(t)) for t in all_extremizers])
+    if not all_extremizers:
+        return np.array([])
 
-    return extreme_points
+    return bezier.point(cps, all_extremizers)
 
 def _fit_y_extremum(cp_y, target_location):
     """ Fit the control point of basic [[0, 0] -> [1, 0]] Quadratic Bezier s.t. 
@@ -214,10 +225,8 @@ def _fit_y_extremum(cp_y, target_location):
         [target_location[0], cp_y[0]], 
         [1, 0]
     ])
-    params = list_to_c(control_bezier)
-    curve = svgpath.QuadraticBezier(*params)
 
-    extremum = _extreme_points(curve)
+    extremum = _extreme_points(control_bezier)
 
     if not len(extremum):
         raise RuntimeError('No extreme points!!')
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 import numpy as np
 from numpy.linalg import norm
 from scipy.spatial.transform import Rotation
@@ -21,6 +22,39 @@ class KeyWrapper(Generic[T, V]):
     def __len__(self) -> int:
         return len(self.it)
 
+class FitCache:
+    """Bounded LRU cache of the curve fitting results keyed by relative target points
+        (or other arrays describing the fitting problem)
+
+        Targets that are equal up to the tolerance share the same entry (exact match with tol=0)
+    """
+    def __init__(self, max_size=1024, tol=1e-9):
+        self.max_size = max_size
+        self.tol = tol
+        self._entries = OrderedDict()
+
+    def _key(self, rel_target):
+        if not self.tol:
+            return tuple(float(c) for c in rel_target)
+        return tuple(int(c) for c in np.round(np.asarray(rel_target) / self.tol))
+
+    def get(self, rel_target):
+        key = self._key(rel_target)
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, rel_target, value):
+        key = self._key(rel_target)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
 def vector_angle(v1, v2):
     """Find an angle between two 2D vectors"""
     v1, v2 = np.asarray(v1), np.asarray(v2)
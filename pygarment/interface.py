@@ -19,8 +19,9 @@ class Interface():
                 s.t. the ruffles with the given rate are created. Default = 1. (no ruffles, smooth connection)
         """
 
-        self.edges = edges if isinstance(edges, EdgeSequence) else EdgeSequence(edges)
-        self.panel = [panel for _ in range(len(self.edges))]  # matches every edge 
+        edges = edges if isinstance(edges, EdgeSequence) else EdgeSequence(edges)
+        self.panel = [panel for _ in range(len(edges))]  # matches every edge 
+        self.edges = edges
 
         # Allow to enfoce change the direction of edge 
         # (used in many-to-many stitches correspondance determination)
@@ -30,6 +31,22 @@ class Interface():
         # Since extending a chain of edges != extending each edge individually
         self.ruffle = [dict(coeff=ruffle, sec=[0, len(self.edges)])]
 
+    @property
+    def edges(self):
+        """Edges of the interface
+
+            NOTE: Resolves the deferred right/wrong side orientation of the panels (see Panel.autonorm()),
+            since it updates the edge objects
+        """
+        for panel in self.panel:
+            if getattr(panel, '_autonorm_pending', False):
+                panel.autonorm()
+        return self._edges
+
+    @edges.setter
+    def edges(self, edges):
+        self._edges = edges
+
     def projecting_edges(self, on_oriented=False) -> EdgeSequence:
         """Return edges shape that should be used when projecting interface onto another panel
             NOTE: reflects current state of the edge object. Call this function again if egdes change (e.g. their direction)
@@ -45,45 +62,72 @@ class Interface():
     def needsFlipping(self, i):
         """ Check if particular edge should be re-oriented to follow the general direction of the interface
         """
-        if self.edges_flipping[i]:
-            return True
-        
-        # Otherwise, try to evaluate
-
-        e = self.edges[i]
-        panel = self.panel[i]
-        s_3d, end_3d = panel.point_to_3D(e.start), panel.point_to_3D(e.end)
-
-        # Corener cases
-        if i == 0:
-            next, next_panel = self.edges[(i+1 % len(self.edges))], self.panel[(i+1)  % len(self.edges)]
-            next_3d = next_panel.point_to_3D(next.midpoint())
-
-            # check by start vertex
-            # NOTE this can misfire in particular 3D orentations
-            return norm(s_3d - next_3d) < norm(end_3d - next_3d)
-        if i == len(self.edges) - 1:
-            prev, prev_panel = self.edges[i-1], self.panel[i-1]
-            prev_3d = prev_panel.point_to_3D(prev.midpoint())
-
-            # check by start vertex
-            # NOTE this can misfire in particular 3D orentations
-            return norm(s_3d - prev_3d) > norm(end_3d - prev_3d)
+        return self._needs_flipping([i])[0]
 
-        # Mid case
-        # Utilize distance from the end vertex to the next panel 
-        # start -> prev + end -> next or other way around  
-        prev, prev_panel = self.edges[i-1], self.panel[i-1]
-        next, next_panel = self.edges[(i+1 % len(self.edges))], self.panel[(i+1)  % len(self.edges)]
+    def _needs_flipping(self, ids):
+        """needsFlipping() evaluated for a number of edges at once
 
-        # Optimal order in 3D
-        prev_3d = prev_panel.point_to_3D(prev.midpoint())
-        next_3d = next_panel.point_to_3D(next.midpoint())
-
-        forward_order_dist = norm(s_3d - prev_3d) + norm(end_3d - next_3d)
-        flipped_order_dist = norm(s_3d - next_3d) + norm(end_3d - prev_3d)
+            NOTE: All the 3D locations involved are calculated with one transformation per panel
+        """
+        n_edges = len(self.edges)
+
+        # Collect points to check: vertices of the edges and midpoints of their neighbours
+        points, panels, checks = [], [], []
+        midpoints = {}   # neighbour id -> point id
+
+        def neighbour_mid(j):
+            if j not in midpoints:
+                midpoints[j] = len(points)
+                points.append(self.edges[j].midpoint())
+                panels.append(self.panel[j])
+            return midpoints[j]
+
+        for i in ids:
+            if self.edges_flipping[i]:
+                checks.append(None)
+                continue
+
+            e, panel = self.edges[i], self.panel[i]
+            s_id = len(points)
+            points += [e.start, e.end]
+            panels += [panel, panel]
+
+            # Corener cases: only the next (first edge) or the previous (last edge) neighbour is used
+            # NOTE: the edge is its own neighbour in single-edge interfaces
+            prev_id = neighbour_mid(i - 1) if i != 0 else None
+            next_id = neighbour_mid((i + 1) % n_edges) if i == 0 or i != n_edges - 1 else None
+            checks.append((s_id, prev_id, next_id))
+
+        points_3d = Interface._points_to_3D(points, panels)
+
+        flips = []
+        for check in checks:
+            if check is None:
+                flips.append(True)
+                continue
+            s_id, prev_id, next_id = check
+            s_3d, end_3d = points_3d[s_id], points_3d[s_id + 1]
+
+            if prev_id is None:
+                # check by start vertex
+                # NOTE this can misfire in particular 3D orentations
+                next_3d = points_3d[next_id]
+                flips.append(norm(s_3d - next_3d) < norm(end_3d - next_3d))
+            elif next_id is None:
+                # check by start vertex
+                # NOTE this can misfire in particular 3D orentations
+                prev_3d = points_3d[prev_id]
+                flips.append(norm(s_3d - prev_3d) > norm(end_3d - prev_3d))
+            else:
+                # Mid case
+                # Utilize distance from the end vertex to the next panel 
+                # start -> prev + end -> next or other way around  
+                prev_3d, next_3d = points_3d[prev_id], points_3d[next_id]
+                forward_order_dist = norm(s_3d - prev_3d) + norm(end_3d - next_3d)
+                flipped_order_dist = norm(s_3d - next_3d) + norm(end_3d - prev_3d)
+                flips.append(flipped_order_dist < forward_order_dist)
 
-        return flipped_order_dist < forward_order_dist
+        return flips
 
     # ANCHOR --- Info ----
     def oriented_edges(self):
@@ -98,8 +142,9 @@ class Interface():
 
         oriented = self.edges.copy()
 
+        flips = self._needs_flipping(range(len(self.edges)))
         for i in range(len(self.edges)):
-            if self.needsFlipping(i):
+            if flips[i]:
                 oriented[i].reverse()
                 oriented[i].flipped = True
             else:
@@ -111,21 +156,16 @@ class Interface():
 
         verts_2d = []
         matching_panels = []
+        seen = set()
         for e, panel in zip(self.edges, self.panel):
-            if all(e.start is not v for v in verts_2d):  # Ensuring uniqueness
-                verts_2d.append(e.start)
-                matching_panels.append(panel)
-            
-            if all(e.end is not v for v in verts_2d):  # Ensuring uniqueness
-                verts_2d.append(e.end)
-                matching_panels.append(panel)
+            for v in (e.start, e.end):
+                if id(v) not in seen:  # Ensuring uniqueness
+                    seen.add(id(v))
+                    verts_2d.append(v)
+                    matching_panels.append(panel)
 
         # To 3D
-        verts_3d = []
-        for v, panel in zip(verts_2d, matching_panels):
-            verts_3d.append(panel.point_to_3D(v))
-
-        return np.asarray(verts_3d)
+        return Interface._points_to_3D(verts_2d, matching_panels)
 
     def bbox_3d(self):
         """Return Interface bounding box"""
@@ -267,8 +307,22 @@ class Interface():
     def _is_order_matching(panel_s, vert_s, panel_1, vert1, panel_2, vert2) -> bool:
         """Check which of the two vertices vert1 (panel_1) or vert2 (panel_2) is closer to the vert_s 
             from panel_s in 3D"""
-        s_3d = panel_s.point_to_3D(vert_s)
-        v1_3d = panel_1.point_to_3D(vert1)
-        v2_3d = panel_2.point_to_3D(vert2)
+        s_3d, v1_3d, v2_3d = Interface._points_to_3D(
+            [vert_s, vert1, vert2], [panel_s, panel_1, panel_2])
 
         return norm(v1_3d - s_3d) < norm(v2_3d - s_3d)
+
+    @staticmethod
+    def _points_to_3D(points_2d, panels):
+        """3D locations of the 2D points given in the local spaces of the matching panels
+
+            NOTE: points of the same panel are transformed at once
+        """
+        points_3d = np.empty((len(points_2d), 3))
+        groups = {}
+        for i, panel in enumerate(panels):
+            groups.setdefault(id(panel), (panel, []))[1].append(i)
+        for panel, ids in groups.values():
+            points_3d[ids] = panel.points_to_3D([points_2d[i] for i in ids])
+
+        return points_3d
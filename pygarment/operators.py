@@ -5,17 +5,19 @@ import numpy as np
 from numpy.linalg import norm
 from scipy.spatial.transform import Rotation as R
 from scipy.optimize import minimize
-import matplotlib.pyplot as plt
 import svgpathtools as svgpath
 
 # Custom 
 from .edge import Edge, CurveEdge, CircleEdge, EdgeSequence
 from .interface import Interface
-from .generic_utils import vector_angle, close_enough, c_to_list, c_to_np, list_to_c
+from .generic_utils import vector_angle, close_enough, c_to_list, c_to_np, list_to_c, FitCache
 from .base import BaseComponent
+from .profiler import profiled
 from . import flags
+from . import bezier
 
 # ANCHOR ----- Edge Sequences Modifiers ----
+@profiled
 def cut_corner(target_shape:EdgeSequence, target_interface:Interface):
     """ Cut the corner made of edges 1 and 2 following the shape of target_shape
         This routine updated the panel geometry and interfaces appropriately
@@ -134,6 +136,7 @@ def cut_corner(target_shape:EdgeSequence, target_interface:Interface):
 
     return corner_shape[1:-1], new_int
 
+@profiled
 def cut_into_edge(target_shape, base_edge:Edge, offset=0, right=True, tol=1e-4):
     """ Insert edges of the target_shape into the given base_edge, starting from offset
         edges in target shape are rotated s.t. start -> end vertex vector is aligned with the edge 
@@ -372,13 +375,26 @@ def even_armhole_openings(front_opening, back_opening, tol=1e-2):
     return front_opening, back_opening
 
 # ANCHOR ----- Curve tools -----
-def _max_curvature(curve, points_estimates=100):
-    """Average curvature in a curve"""
-    # NOTE: this work slow, but direct evaluation seems
-    # infeasible
+def _max_curvature(cps, points_estimates=100):
+    """Max curvature of a Bezier curve given by control points, 
+        estimated on a uniform parameter grid"""
+    # NOTE: direct evaluation seems infeasible
     # Some hints here: https://math.stackexchange.com/questions/1954845/bezier-curvature-extrema
-    t_space = np.linspace(0, 1, points_estimates)
-    return max([curve.curvature(t) for t in t_space])
+    return bezier.max_curvature(cps, points_estimates)
+
+def _unit_tangent_diff(derivative, target):
+    """Squared distance between the unit tangent given by the curve 
+        derivative and the target unit vector, and its gradient w.r.t. the derivative"""
+    speed = np.linalg.norm(derivative)
+    if speed == 0:
+        return np.dot(target, target), np.zeros(2)
+    tangent = derivative / speed
+    diff = tangent - target
+    grad = 2 * diff
+    # Through normalization
+    grad = (grad - tangent * np.dot(tangent, grad)) / speed
+
+    return np.dot(diff, diff), grad
 
 def _bend_extend_2_tangent(
         shift, cp, target_len, direction, 
@@ -386,6 +402,8 @@ def _bend_extend_2_tangent(
         point_estimates=50):
     """Evaluate how well curve preserves the length and tangents
 
+        Returns the objective value and its gradient w.r.t. shift
+
         NOTE: point_estimates controls average curvature evaluation.
             The higher the number, the more stable the optimization,
             but higher computational cost
@@ -398,23 +416,46 @@ def _bend_extend_2_tangent(
         cp[-1] + direction * shift[4]
     ])
 
-    params = control[:, 0] + 1j*control[:, 1]
-    curve_inverse = svgpath.CubicBezier(*params)
-
-    length_diff = (curve_inverse.length() - target_len)**2  # preservation
+    # Length preservation
+    length = bezier.length(control)
+    length_diff = (length - target_len)**2  
+    grad_control = 2 * (length - target_len) * bezier.length_gradient(control)
 
-    tan_0_diff = (abs(curve_inverse.unit_tangent(0) - target_tangent_start))**2
-    tan_1_diff = (abs(curve_inverse.unit_tangent(1) - target_tangent_end))**2
+    # Tangents at the endpoints
+    tan_0_diff, grad_tan_0 = _unit_tangent_diff(3 * (control[1] - control[0]), target_tangent_start)
+    tan_1_diff, grad_tan_1 = _unit_tangent_diff(3 * (control[3] - control[2]), target_tangent_end)
+    grad_control[1] += 3 * grad_tan_0
+    grad_control[3] += 3 * grad_tan_1
+    grad_control[2] -= 3 * grad_tan_1
 
     # NOTE: tried regularizing based on Y value in relative coordinates (for speed), 
     # But it doesn't produce good results
-    curvature_reg = _max_curvature(curve_inverse, points_estimates=point_estimates)**2
+    t_space = np.linspace(0, 1, point_estimates)
+    curvatures = bezier.curvature(control, t_space)
+    max_id = np.argmax(curvatures)
+    curvature_reg = curvatures[max_id]**2
+    if np.isfinite(curvature_reg):
+        # NOTE: the gradient of max is taken at the maximizer on the grid
+        grad_control += 2 * curvatures[max_id] * bezier.curvature_gradient(control, t_space[max_id])
 
     end_expantion_reg = 0.001*shift[-1]**2 
 
-    return length_diff + tan_0_diff + tan_1_diff + curvature_reg + end_expantion_reg
+    grad = np.array([
+        grad_control[1][0], grad_control[1][1], 
+        grad_control[2][0], grad_control[2][1],
+        np.dot(grad_control[3], direction) + 0.002 * shift[-1]
+    ])
+
+    return length_diff + tan_0_diff + tan_1_diff + curvature_reg + end_expantion_reg, grad
       
-def curve_match_tangents(curve, target_tan0, target_tan1, return_as_edge=False):
+# Solutions of curve_match_tangents() keyed by the problem inputs, 
+# s.t. re-building the garment (e.g. on GUI reload) does not re-run 
+# the optimization for the unchanged curves. Keys are exact (tol=0)
+tangent_match_cache = FitCache(max_size=512, tol=0)
+
+@profiled
+def curve_match_tangents(
+        curve, target_tan0, target_tan1, return_as_edge=False, use_cache=True):
     """Update the curve to have the desired tangent directions at endpoints 
         while preserving curve length and overall direction
 
@@ -422,7 +463,13 @@ def curve_match_tangents(curve, target_tan0, target_tan1, return_as_edge=False):
         * control points for the final CubicBezier curves
         * Or CurveEdge instance, if return_as_edge=True
 
+        * use_cache -- if set, the solution of a previous call with exactly the same
+            inputs is re-used instead of running the optimization again (see tangent_match_cache)
+
         NOTE: Only Cubic Bezier curves are supported
+        NOTE: The objective is flat around the solution. Small numerical differences 
+            (e.g. in arc length evaluation) may lead to noticeably different control points
+            with similar objective values
     """
     if not isinstance(curve, svgpath.CubicBezier):
         raise NotImplementedError(
@@ -437,26 +484,42 @@ def curve_match_tangents(curve, target_tan0, target_tan1, return_as_edge=False):
     target_tan0 = target_tan0 / np.linalg.norm(target_tan0)
     target_tan1 = target_tan1 / np.linalg.norm(target_tan1)
 
-    # match tangents with the requested ones while preserving length
-    out = minimize(
-        _bend_extend_2_tangent, # with tangent matching
-        [0, 0, 0, 0, 0], 
-        args=(
-            curve_cps, 
-            curve.length(),
-            direction,
-            list_to_c(target_tan0),  
-            list_to_c(target_tan1), 
-            70   # NOTE: Low values cause instable resutls
-        ),
-        method='L-BFGS-B',
-    )
-    if not out.success:
-        print(f'Curve_match_tangents::WARNING::optimization not successfull')
-        if flags.VERBOSE:
-            print(out)
-
-    shift = out.x
+    cache_key = np.concatenate([curve_cps.flatten(), target_tan0, target_tan1])
+    shift = tangent_match_cache.get(cache_key) if use_cache else None
+    if shift is None:
+        # match tangents with the requested ones while preserving length
+        # NOTE: The max curvature term makes the objective non-smooth, and L-BFGS-B
+        # tends to stall at its kinks. Restarting from the last solution
+        # (with a fresh Hessian approximation) gets it past such stalls
+        shift, best = np.zeros(5), np.inf
+        for restart in range(3):
+            out = minimize(
+                _bend_extend_2_tangent, # with tangent matching
+                shift,
+                args=(
+                    curve_cps,
+                    bezier.length(curve_cps),
+                    direction,
+                    target_tan0,
+                    target_tan1,
+                    70   # NOTE: Low values cause instable resutls
+                ),
+                method='L-BFGS-B',
+                jac=True,   # Objective returns analytic gradient
+                options={'ftol': 1e-12, 'gtol': 1e-9}
+            )
+            # NOTE: restarts from the converged point may end up in line search failure
+            # as there is nowhere to descend to, hence only the first run is checked
+            if not restart and not out.success:
+                print(f'Curve_match_tangents::WARNING::optimization not successfull')
+                if flags.VERBOSE:
+                    print(out)
+            if out.fun >= best:
+                break
+            shift, best = out.x, out.fun
+
+    if use_cache:
+        tangent_match_cache.put(cache_key, shift)
 
     fin_curve_cps = [
         curve_cps[0].tolist(),
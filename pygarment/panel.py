@@ -6,6 +6,7 @@ from scipy.spatial.transform import Rotation as R
 
 # Custom
 from pattern.core import BasicPattern
+from pattern import intersect
 from pattern.wrappers import VisPattern
 from .base import BaseComponent
 from .edge import Edge, EdgeSequence
@@ -19,15 +20,34 @@ class Panel(BaseComponent):
     
     NOTE: All operations methods return 'self' object to allow sequential applications
 
+    NOTE: Right/wrong side orientation (see autonorm()) is updated lazily: placement operations
+        only mark it as outdated, and it's resolved on the next access to the panel edges
+
     """
+    _autonorm_pending = False   # Placement changed since the last autonorm()
+
     def __init__(self, name) -> None:
         super().__init__(name)
 
         self.translation = np.zeros(3)
         self.rotation = R.from_euler('XYZ', [0, 0, 0])  # zero rotation
+        self._rotation_cache = None   # (rotation, its matrix) -- see _rotation_matrix()
         # NOTE: initiating with empty sequence allows .append() to it safely
         self.edges =  EdgeSequence() 
 
+    @property
+    def edges(self):
+        """Edge loop of the panel (with up-to-date right/wrong side orientation)"""
+        if self._autonorm_pending:
+            self.autonorm()
+        return self._edges
+
+    @edges.setter
+    def edges(self, edges):
+        if self._autonorm_pending:   # Orientation update belongs to the replaced edges
+            self.autonorm()
+        self._edges = edges
+
     # Info
     def pivot_3D(self):
         """Pivot point of a panel in 3D"""
@@ -45,14 +65,14 @@ class Panel(BaseComponent):
         """
         point_2d = copy(point_2d)  # Remove unwanted object reference 
                                    # In case an actual vertex was used as a target point
+        if self._autonorm_pending:  # Orientation for the current placement
+            self.autonorm()
 
         if replicate_placement:
             self.translation = self.point_to_3D(point_2d)
 
         # UPD vertex locations relative to new pivot
-        for v in self.edges.verts():
-            v[0] -= int(point_2d[0])
-            v[1] -= int(point_2d[1])
+        self.edges.translate_by([-int(point_2d[0]), -int(point_2d[1])])
 
     def top_center_pivot(self):
         """One of the most useful pivots 
@@ -71,9 +91,7 @@ class Panel(BaseComponent):
             [top_right[0], mid_y],
             [low_left[0], mid_y]
         ]
-        mid_points_3D = np.vstack(tuple(
-            [self.point_to_3D(coords) for coords in mid_points_2D]
-        ))
+        mid_points_3D = self.points_to_3D(mid_points_2D)
         top_mid_point = mid_points_3D[:, 1].argmax()
 
         self.set_pivot(mid_points_2D[top_mid_point])
@@ -83,14 +101,14 @@ class Panel(BaseComponent):
     def translate_by(self, delta_vector):
         """Translate panel by a vector"""
         self.translation = self.translation + np.array(delta_vector)
-        self.autonorm()
+        self._autonorm_pending = True
 
         return self
     
     def translate_to(self, new_translation):
         """Set panel translation to be exactly that vector"""
         self.translation = np.asarray(new_translation)
-        self.autonorm()
+        self._autonorm_pending = True
 
         return self
     
@@ -99,7 +117,7 @@ class Panel(BaseComponent):
             * delta_rotation: scipy rotation object
         """
         self.rotation = delta_rotation * self.rotation
-        self.autonorm()
+        self._autonorm_pending = True
 
         return self
 
@@ -110,7 +128,7 @@ class Panel(BaseComponent):
         if not isinstance(new_rot, R):
             raise ValueError(f'{self.__class__.__name__}::Error::Only accepting rotations in scipy format')
         self.rotation = new_rot
-        self.autonorm()
+        self._autonorm_pending = True
 
         return self
 
@@ -139,13 +157,16 @@ class Panel(BaseComponent):
             This should provide correct panel orientation in most cases.
 
             NOTE: for best results, call autonorm after translation specification
+            NOTE: Placement operations call it implicitly, the evaluation is deferred
+                until the panel edges are used
         """
+        self._autonorm_pending = False
         norm_dr = self.norm()
         
         # NOTE: Nothing happens if self.translation is zero
         if np.dot(norm_dr, self.translation) < 0: 
             # Swap if wrong  
-            self.edges.reverse()
+            self._edges.reverse()
         
         return self
 
@@ -168,15 +189,38 @@ class Panel(BaseComponent):
             curr_euler = self.rotation.as_euler('XYZ')
             curr_euler[1] *= -1  
             curr_euler[2] *= -1  
-            self.rotate_to(R.from_euler('XYZ', curr_euler))  
-
-            # Fix right/wrong side
-            self.autonorm()
+            self.rotate_to(R.from_euler('XYZ', curr_euler))  # NOTE: Also fixes right/wrong side
         else:
             raise NotImplementedError(f'{self.name}::Error::Mirrowing over arbitrary axis is not implemented')
 
         return self
         
+    # ANCHOR - Checks
+    def self_intersections(self, curve_segments=10):
+        """Intersecting edges of the panel outline
+
+            Returns {panel name: [(edge id, edge id), ...]} with the ids of the edges
+            in self.edges, or empty dictionary if the panel is not self-intersecting
+            (see pattern.intersect.intersecting_edges() for the format)
+
+            * curve_segments -- number of segments to approximate curved edges with
+        """
+        return Panel.find_intersections([self], curve_segments)
+
+    def is_self_intersecting(self, curve_segments=10):
+        """Returns True if the panel outline is self-intersecting"""
+        return bool(Panel.find_intersections([self], curve_segments, first_only=True))
+
+    @staticmethod
+    def find_intersections(panels, curve_segments=10, first_only=False):
+        """Intersecting edges of the given panels, checked all at once
+            (see Panel.self_intersections())
+
+            * first_only -- stop after the first found intersections
+        """
+        found = intersect.intersecting_edges([p._outline() for p in panels], curve_segments, first_only)
+        return {panels[p_id].name: pairs for p_id, pairs in found.items()}
+
     # ANCHOR - Build the panel -- get serializable representation
     def assembly(self):
         """Convert panel into serialazable representation
@@ -228,6 +272,17 @@ class Panel(BaseComponent):
         return spattern
 
     # ANCHOR utils
+    def _outline(self):
+        """Edge loop of the panel in the specification format (without merging the vertices)"""
+        vertices, edges = [], []
+        for e in self.edges:
+            verts, edge = e.assembly()
+            edge['endpoints'] = [len(vertices), len(vertices) + 1]
+            vertices += verts
+            edges.append(edge)
+
+        return {'vertices': vertices, 'edges': edges}
+
     def _center_2D(self):
         """Approximate Location of the panel center. 
             
@@ -241,14 +296,30 @@ class Panel(BaseComponent):
 
     def point_to_3D(self, point_2d):
         """Calculate 3D location of a point given in the local 2D plane """
-        point_2d = np.asarray(point_2d)
-        if len(point_2d) == 2:
-            point_2d = np.append(point_2d, 0)
+        return self.points_to_3D([point_2d])[0]
 
-        point_3d = self.rotation.apply(point_2d)
-        point_3d += self.translation
+    def points_to_3D(self, points_2d):
+        """Calculate 3D locations of a set of points given in the local 2D plane
+            (N x 2, or N x 3 with the local z coordinate) all at once
 
-        return point_3d
+            Returns N x 3 array
+        """
+        points_2d = np.asarray(points_2d, dtype=float)
+        if not len(points_2d):
+            return np.empty((0, 3))
+        rot_matrix = self._rotation_matrix()
+
+        return points_2d @ rot_matrix[:, :points_2d.shape[1]].T + self.translation
+
+    def _rotation_matrix(self):
+        """Matrix of the current panel rotation
+
+            NOTE: The matrix is cached until the rotation object is replaced
+            (e.g. by rotate_by() or rotate_to())
+        """
+        if self._rotation_cache is None or self._rotation_cache[0] is not self.rotation:
+            self._rotation_cache = (self.rotation, self.rotation.as_matrix())
+        return self._rotation_cache[1]
 
     def norm(self):
         """Normal direction for the current panel"""
@@ -265,19 +336,13 @@ class Panel(BaseComponent):
         # To make norm evaluation work for non-convex panels
         # Evalute norm candidates for all edges and then weight them. 
         # The dominant norm direction should be the correct one 
-        norms = []
-        for e in lin_edges:
-            vert_0 = self.point_to_3D(e.start)
-            vert_1 = self.point_to_3D(e.end)
-
-            # Pylance + NP error for unreachanble code -- see https://github.com/numpy/numpy/issues/22146
-            # Works ok for numpy 1.23.4+
-            norm = np.cross(vert_1 - vert_0, center_3d - vert_0)
-            norm /= np.linalg.norm(norm) 
-            norms.append(norm)
+        verts_3d = self.points_to_3D([v for e in lin_edges for v in (e.start, e.end)])
+        vert_0, vert_1 = verts_3d[0::2], verts_3d[1::2]
+        norms = np.cross(vert_1 - vert_0, center_3d - vert_0)
+        norms /= np.linalg.norm(norms, axis=-1, keepdims=True)
 
         # Current norm direction
-        avg_norm = sum(norms) / len(norms)
+        avg_norm = norms.sum(axis=0) / len(norms)
 
         if close_enough(np.linalg.norm(avg_norm), 0):
             # Indecisive averaging, so using just one of the norms
@@ -292,6 +357,6 @@ class Panel(BaseComponent):
         # Using curve linearization for more accurate approximation of bbox
         lin_edges = EdgeSequence([e.linearize() for e in self.edges])
         verts_2d = lin_edges.verts()
-        verts_3d = np.asarray([self.point_to_3D(v) for v in verts_2d])
+        verts_3d = self.points_to_3D(verts_2d)
 
         return verts_3d.min(axis=0), verts_3d.max(axis=0)
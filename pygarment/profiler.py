@@ -0,0 +1,194 @@
+"""Hierarchical profiling of garment builds
+
+    Within BuildProfiler (used as a context manager), construction of the components,
+    their assembly, matching of the stitching rules and the heavy operators
+    (marked with @profiled) are timed. The measurements are organized in a tree following
+    the nesting of the calls, e.g. construction of a sleeve within the construction of a bodice.
+
+    Example:
+        profiler = BuildProfiler()
+        with profiler:
+            pattern = MetaGarment('name', body, design)()
+
+        print(profiler.summary())
+        profiler.save_chrome_trace('build_trace.json')  # chrome://tracing or https://ui.perfetto.dev
+        profiler.save_folded('build.folded')   # flamegraph.pl or https://speedscope.app
+
+    NOTE: Profiling is off unless a BuildProfiler is active,
+    the instrumented functions only check for it otherwise
+"""
+
+import functools
+import json
+import time
+
+_active_profiler = None    # BuildProfiler of the current build
+
+
+class _Node():
+    """Calls with the same name & call stack"""
+    def __init__(self, name) -> None:
+        self.name = name
+        self.calls = 0
+        self.time = 0
+        self.children = {}
+
+    def child(self, name):
+        if name not in self.children:
+            self.children[name] = _Node(name)
+        return self.children[name]
+
+    def self_time(self):
+        return self.time - sum(c.time for c in self.children.values())
+
+    def merge(self, other):
+        """Add the measurements of the other node (with the same name)"""
+        self.calls += other.calls
+        self.time += other.time
+        for name, child in other.children.items():
+            self.child(name).merge(child)
+
+
+class BuildProfiler():
+    """Profiler of garment builds, see module description
+
+        Measurements of all the builds performed with the profiler active are accumulated
+    """
+    def __init__(self) -> None:
+        self.root = _Node('build')
+        self.events = []   # Chrome trace events
+
+        self._stack = [self.root]
+        self._start = time.perf_counter()
+        self._prev = None
+
+    def __enter__(self):
+        global _active_profiler
+        self._prev, _active_profiler = _active_profiler, self
+        self.root.calls += 1
+        self._enter_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _active_profiler
+        self.root.time += time.perf_counter() - self._enter_time
+        _active_profiler = self._prev
+
+    def clear(self):
+        self.root = _Node('build')
+        self.events = []
+        self._stack = [self.root]
+
+    # Output
+    def summary(self, min_time=0.):
+        """Text representation of the call tree (calls, total & self time)
+
+            * min_time -- hide the nodes that took less time (in seconds)
+        """
+        lines = [f'{"calls":>7} {"total, ms":>10} {"self, ms":>10}  name']
+
+        def add(node, depth):
+            lines.append(
+                f'{node.calls:>7} {node.time * 1000:>10.2f} {node.self_time() * 1000:>10.2f}  '
+                f'{"  " * depth}{node.name}')
+            for child in sorted(node.children.values(), key=lambda n: -n.time):
+                if child.time >= min_time:
+                    add(child, depth + 1)
+        add(self.root, 0)
+
+        return '\n'.join(lines)
+
+    def as_dict(self):
+        """The call tree as nested dictionaries {name, calls, time, self_time, children}"""
+        def convert(node):
+            return {
+                'name': node.name,
+                'calls': node.calls,
+                'time': node.time,
+                'self_time': node.self_time(),
+                'children': [convert(c) for c in node.children.values()]
+            }
+        return convert(self.root)
+
+    def save_chrome_trace(self, filename):
+        """Save the timeline of the calls in Chrome Trace Event format"""
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+    def save_folded(self, filename):
+        """Save the call tree as folded stacks (self time in microseconds) for flamegraph tools"""
+        lines = []
+
+        def add(node, stack):
+            stack = stack + [node.name.replace(';', ',')]
+            self_time = int(round(node.self_time() * 1e6))
+            if self_time > 0:
+                lines.append(f'{";".join(stack)} {self_time}')
+            for child in node.children.values():
+                add(child, stack)
+        add(self.root, [])
+
+        with open(filename, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    # Measurements
+    def _call(self, name, func, args, kwargs, rename=None):
+        """Time the call of the function as a child of the current node
+
+            * rename -- function to get the final name of the node from the result of the call
+                (e.g. for components that get their names on construction)
+        """
+        parent = self._stack[-1]
+        node = _Node(name) if rename is not None else parent.child(name)
+        self._stack.append(node)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            if rename is not None:
+                name = rename(result)
+            return result
+        finally:
+            duration = time.perf_counter() - start
+            self._stack.pop()
+            node.calls += 1
+            node.time += duration
+            if rename is not None:
+                node.name = name
+                parent.child(name).merge(node)
+
+            self.events.append({
+                'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                'ts': (start - self._start) * 1e6, 'dur': duration * 1e6
+            })
+
+
+def is_active():
+    """Check if any BuildProfiler is collecting measurements"""
+    return _active_profiler is not None
+
+
+def call(name, func, *args, **kwargs):
+    """Call the function and record it with the given name if profiling is active"""
+    if _active_profiler is None:
+        return func(*args, **kwargs)
+    return _active_profiler._call(name, func, args, kwargs)
+
+
+def construct(cls, build, args, kwargs):
+    """Construct the component with build(cls, args, kwargs) and record it
+        as '<class name>:<component name>' if profiling is active"""
+    if _active_profiler is None:
+        return build(cls, args, kwargs)
+    return _active_profiler._call(
+        cls.__name__, build, (cls, args, kwargs), {},
+        rename=lambda comp: f'{cls.__name__}:{getattr(comp, "name", "")}')
+
+
+def profiled(func):
+    """Decorator to record the calls of the function when profiling is active"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _active_profiler is None:
+            return func(*args, **kwargs)
+        return _active_profiler._call(func.__qualname__, func, args, kwargs)
+    return wrapper
@@ -0,0 +1,158 @@
+"""Sampling of the design space defined by the design parameter files
+
+    Design parameters are expected in the format of assets/design_params/*.yaml:
+    every parameter is a dictionary with the current value ('v'),
+    the range of values ('range') and the value type ('type':
+    float, int, bool, select or select_null)
+"""
+
+from copy import deepcopy
+import numpy as np
+import yaml
+
+
+class DesignSampler():
+    """Draw batches of random designs from the parameter ranges of a design file
+
+        Samples are returned as numpy structured arrays with one field per
+        parameter named by its path in the design dictionary ('sleeve.length').
+        Select-type parameters are stored as indices into their range.
+        Use to_design() to convert a sample into the design dictionary accepted by garment programs
+
+        Supported strategies:
+            * 'uniform' -- independent uniform sampling
+            * 'lhs' -- Latin hypercube sampling
+            * 'sobol' -- scrambled Sobol sequence (N = powers of 2 give the best coverage,
+                other N are truncated from the next power of 2)
+    """
+    strategies = ['uniform', 'lhs', 'sobol']
+
+    def __init__(self, param_file='') -> None:
+        self.params = {}
+        self.paths = []     # Locations of parameters in the design dictionary
+        self.types = []
+        self.ranges = []
+        if param_file:
+            self.load(param_file)
+
+    def load(self, param_file):
+        """Load base design & parameter declarations from file"""
+        with open(param_file, 'r') as f:
+            self.set_design(yaml.safe_load(f)['design'])
+
+    def set_design(self, design):
+        """Use given design dictionary as base design"""
+        self.params = design
+        self.paths = self._param_paths(design)
+        self.types, self.ranges = [], []
+        for path in self.paths:
+            param = self._get(self.params, path)
+            self.types.append(param['type'])
+            self.ranges.append(param['range'])
+
+        self.dtype = np.dtype([
+            ('.'.join(path), self._field_type(p_type))
+            for path, p_type in zip(self.paths, self.types)])
+
+    # Sampling
+    def sample_batch(self, n, strategy='uniform', seed=None):
+        """Draw n designs at once
+
+            * strategy -- one of DesignSampler.strategies
+            * seed -- random seed (or sequence of seeds) -- the same seed
+                produces the same samples
+
+            Returns structured array of n samples
+        """
+        unit = self._unit_samples(n, strategy, seed)
+
+        samples = np.empty(n, dtype=self.dtype)
+        for i, (name, p_type, p_range) in enumerate(zip(self.dtype.names, self.types, self.ranges)):
+            samples[name] = self._from_unit(unit[:, i], p_type, p_range)
+
+        return samples
+
+    def sample(self, seed=None):
+        """Single random design dictionary (sampled uniformly)"""
+        return self.to_design(self.sample_batch(1, seed=seed)[0])
+
+    def to_design(self, sample):
+        """Design dictionary corresponding to the sample
+            (a record of the structured array from sample_batch())"""
+        design = deepcopy(self.params)
+        for name, path, p_type, p_range in zip(self.dtype.names, self.paths, self.types, self.ranges):
+            value = sample[name].item()
+            if p_type in ['select', 'select_null']:
+                value = p_range[value]
+            self._get(design, path)['v'] = value
+
+        self._sync_left(design)
+        return design
+
+    # Utils
+    def _unit_samples(self, n, strategy, seed):
+        """Samples in [0, 1)^d"""
+        rng = np.random.default_rng(seed)
+        d = len(self.paths)
+        if strategy == 'uniform':
+            return rng.random((n, d))
+        if strategy in ['lhs', 'sobol']:
+            from scipy.stats import qmc   # Slow to import
+        if strategy == 'lhs':
+            return qmc.LatinHypercube(d, seed=rng).random(n)
+        if strategy == 'sobol':
+            # NOTE: Sobol sequences are balanced for N = 2^m only,
+            # other N take the first points of the next complete sequence
+            m = max(n - 1, 0).bit_length()
+            return qmc.Sobol(d, scramble=True, seed=rng).random_base2(m)[:n]
+
+        raise ValueError(
+            f'{self.__class__.__name__}::Error::Unknown sampling strategy {strategy}. '
+            f'Use one of {self.strategies}')
+
+    def _from_unit(self, u, p_type, p_range):
+        """Map values in [0, 1) to the parameter range"""
+        if p_type in ['select', 'select_null']:
+            return np.minimum((u * len(p_range)).astype(int), len(p_range) - 1)
+        if p_type == 'bool':
+            return u >= 0.5
+        if p_type == 'int':
+            lo, hi = p_range
+            return np.minimum(lo + (u * (hi - lo + 1)).astype(int), hi)
+        if p_type == 'float':
+            lo, hi = p_range
+            return lo + u * (hi - lo)
+
+        raise NotImplementedError(
+            f'{self.__class__.__name__}::Error::Sampling of {p_type} parameters is not supported')
+
+    def _field_type(self, p_type):
+        if p_type in ['select', 'select_null', 'int']:
+            return np.int32
+        if p_type == 'bool':
+            return np.bool_
+        return np.float64
+
+    def _param_paths(self, design, prefix=()):
+        """Locations of parameter dictionaries in the nested design structure"""
+        paths = []
+        for key, value in design.items():
+            if isinstance(value, dict):
+                if 'v' in value and 'range' in value:
+                    paths.append(prefix + (key, ))
+                else:
+                    paths += self._param_paths(value, prefix + (key, ))
+        return paths
+
+    def _get(self, design, path):
+        for key in path:
+            design = design[key]
+        return design
+
+    def _sync_left(self, design):
+        """Use the same parameters for the left side of a garment if
+            asymmetry is not enabled (as in the configurator)"""
+        if 'left' in design and not design['left']['enable_asym']['v']:
+            for k in design['left']:
+                if k != 'enable_asym':
+                    design['left'][k] = deepcopy(design[k])
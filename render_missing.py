@@ -0,0 +1,43 @@
+"""Create the images of the serialized sewing patterns that don't have them yet
+    e.g. after generating a dataset with --render skip, or if some renderings failed
+
+    Example:
+        python render_missing.py Logs/dataset --with_3d
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Makes core library available without extra installation steps
+sys.path.insert(0, './external/')
+sys.path.insert(1, './')
+
+from pattern.wrappers import render_missing
+
+
+def get_command_args():
+    parser = argparse.ArgumentParser(
+        description='Render the serialized sewing patterns that miss their images')
+    parser.add_argument('path', help='Folder to search for the patterns (recursively)')
+    parser.add_argument('--with_3d', nargs='?', const='matplotlib', default=False, choices=['matplotlib', 'fast'],
+                        help='Save 3D visualization of the patterns: matplotlib 3D plot (default) '
+                             'or fast orthographic preview of the panel outlines')
+    parser.add_argument('--with_text', action='store_true', help='Add panel names to the images')
+    parser.add_argument('--view_ids', action='store_true', help='Add vertex & edge ids to the images')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = get_command_args()
+
+    start_time = time.time()
+    rendered, fails = render_missing(
+        args.path, 
+        with_3d=args.with_3d, with_text=args.with_text, view_ids=args.view_ids,
+        workers=args.workers)
+    
+    print(f'Rendered {len(rendered)} patterns in {time.time() - start_time:.2f}s, {len(fails)} failed')